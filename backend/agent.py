@@ -4,42 +4,145 @@ Agentic tool calling system for Nyay Sathi.
 The LLM decides which tools to use based on the query.
 """
 
-import json
-from typing import Any, AsyncGenerator
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, NamedTuple
 
-from groq import Groq
+import orjson
+from groq.types.chat import ChatCompletionMessage
 
-from config import GROQ_API_KEY, GROQ_MODEL
+from browser import read_url, web_search
+from config import (
+    CONFIDENCE_THRESHOLD,
+    GROQ_API_KEY,
+    GROQ_MODEL,
+    MAX_CHUNK_CHARS,
+    MAX_CTX_CHUNKS,
+    SPECULATIVE_WEB_SEARCH,
+    TEXT_PREVIEW_FIELD,
+)
+from context_budget import count_tokens, fit_messages
+from llm import ASYNC_GROQ, get_groq_client
 from logger import rag_logger as logger
+from rag_engine import cache_answer, get_cached_answer, retrieve_sections_async
 from tools import TOOLS, AGENT_SYSTEM_PROMPT
 
-# Lazy imports to avoid circular dependencies
-_rag_engine = None
-_browser = None
 
+# XML-style tool call patterns, e.g. <rag_search>{"query": "..."}</rag_search>.
+# Matches any closing tag or just end of string, since models also emit
+# <rag_search>...</function> or leave the tag unclosed.
+_TOOL_XML_PATTERNS = [
+    (
+        t_name,
+        re.compile(
+            rf"<{re.escape(t_name)}>(.*?)(?:</{re.escape(t_name)}>|</function>|$)",
+            re.DOTALL | re.IGNORECASE,
+        ),
+    )
+    for t_name in (tool_def["function"]["name"] for tool_def in TOOLS)
+]
 
-def _get_rag_engine():
-    global _rag_engine
-    if _rag_engine is None:
-        from rag_engine import retrieve, get_vectors_count
-        _rag_engine = {"retrieve": retrieve, "count": get_vectors_count}
-    return _rag_engine
 
+async def _stream_completion(**kwargs: Any) -> AsyncIterator[Any]:
+    """
+    Stream chat completion chunks without blocking the event loop.
+    
+    With the sync client, the request and the whole stream are consumed in
+    a worker thread, so chunks arrive at once rather than incrementally.
+    """
+    client = get_groq_client()
+    
+    if ASYNC_GROQ:
+        async for chunk in await client.chat.completions.create(stream=True, **kwargs):
+            yield chunk
+        return
+    
+    chunks = await asyncio.to_thread(
+        lambda: list(client.chat.completions.create(stream=True, **kwargs))
+    )
+    for chunk in chunks:
+        yield chunk
+
+
+_GREETINGS: frozenset[str] = frozenset({
+    "hi", "hello", "hey", "good morning", "good evening", "good afternoon",
+    "namaste", "namaskar", "thanks", "thank you", "bye", "goodbye",
+})
+
+
+class _StreamedTurn:
+    """Assembles an assistant message from streamed completion chunks."""
+
+    def __init__(self):
+        self.content_parts: list[str] = []
+        self.tool_calls: dict[int, dict] = {}
+        self.usage: Any = None
+        self.finish_reason: str | None = None
 
-async def _get_browser():
-    global _browser
-    if _browser is None:
-        from browser import web_search, read_url
-        _browser = {"search": web_search, "read": read_url}
-    return _browser
+    def add(self, chunk: Any) -> str:
+        """Merge a chunk into the turn and return its text delta."""
+        x_groq = getattr(chunk, "x_groq", None)
+        usage = getattr(chunk, "usage", None) or (x_groq.usage if x_groq else None)
+        if usage:
+            self.usage = usage
+
+        if not chunk.choices:
+            return ""
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta
+
+        # Tool calls arrive as deltas keyed by index
+        for tc in delta.tool_calls or []:
+            entry = self.tool_calls.setdefault(tc.index, {
+                "id": "", "type": "function", "function": {"name": "", "arguments": ""}
+            })
+            if tc.id:
+                entry["id"] = tc.id
+            if tc.function:
+                entry["function"]["name"] += tc.function.name or ""
+                entry["function"]["arguments"] += tc.function.arguments or ""
+
+        if delta.content:
+            self.content_parts.append(delta.content)
+            return delta.content
+        return ""
+
+    def message(self) -> ChatCompletionMessage:
+        """Build the complete assistant message."""
+        return ChatCompletionMessage(
+            role="assistant",
+            content="".join(self.content_parts) or None,
+            tool_calls=[self.tool_calls[i] for i in sorted(self.tool_calls)] or None,
+        )
+
+
+_THANKS: frozenset[str] = frozenset({"thanks", "thank you"})
+_FAREWELLS: frozenset[str] = frozenset({"bye", "goodbye"})
+
+
+def _greeting_reply(query: str) -> str | None:
+    """Get a canned reply if the query is exactly a greeting, else None."""
+    normalized = query.strip().rstrip("!.,?").lower()
+    if normalized not in _GREETINGS:
+        return None
+    if normalized in _THANKS:
+        return "You're welcome! Feel free to ask if you have any other questions about Indian law."
+    if normalized in _FAREWELLS:
+        return "Goodbye! Come back anytime you have a question about Indian law."
+    return "Namaste! I'm Nyay Sathi. Ask me anything about Indian law, acts or sections."
 
 
 def _is_greeting(query: str) -> bool:
     """Check if the query is just a greeting (no legal question)."""
-    greetings = {"hi", "hello", "hey", "good morning", "good evening", "good afternoon", 
-                 "namaste", "namaskar", "thanks", "thank you", "bye", "goodbye"}
-    normalized = query.lower().strip().rstrip("!.,?")
-    return normalized in greetings or len(normalized) < 4
+    normalized = query.strip().rstrip("!.,?")
+    # Cheapest test first: very short inputs are never legal questions
+    if len(normalized) < 4:
+        return True
+    return normalized.lower() in _GREETINGS
 
 
 # Tool display names for better UX
@@ -65,119 +168,547 @@ TOOL_DISPLAY_INFO = {
 }
 
 
+def _get_tool_info(name: str) -> dict:
+    """Get display info for a tool, with a generic fallback."""
+    return TOOL_DISPLAY_INFO.get(name, {
+        "name": name, "icon": "🔧", "searching": f"Running {name}", "detail": ""
+    })
+
+
 # =============================================================================
 # TOOL EXECUTION
 # =============================================================================
 
+# Max concurrent executions per tool; read_url fetches whole pages
+_TOOL_CONCURRENCY = {"rag_search": 8, "web_search": 4, "read_url": 2}
+_DEFAULT_TOOL_CONCURRENCY = 4
+
+# Created lazily so they are made inside the running event loop
+_tool_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+def _get_tool_semaphore(name: str) -> asyncio.Semaphore:
+    """Get the concurrency limit for a tool."""
+    semaphore = _tool_semaphores.get(name)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_TOOL_CONCURRENCY.get(name, _DEFAULT_TOOL_CONCURRENCY))
+        _tool_semaphores[name] = semaphore
+    return semaphore
+
+
 async def execute_tool(name: str, args: dict) -> dict:
     """
     Execute a tool and return the result.
+    
+    Calls of the same tool are bounded by a per-tool semaphore, so a burst of
+    parallel tool calls cannot flood the vector index or trusted sites.
     """
+    if name == "web_search":
+        # Claim a speculative search for this query (it holds its own slot).
+        # A finished one has already filled the tool cache.
+        prefetch = _web_prefetch.pop(_normalize_query(args.get("query", "")), None)
+        if prefetch is not None and not prefetch.done():
+            logger.debug("Using speculative web search")
+            return await asyncio.shield(prefetch)
+    
+    async with _get_tool_semaphore(name):
+        return await _dispatch_tool(name, args)
+
+
+# Recent rag_search/web_search results, keyed by (tool, normalized query)
+_TOOL_CACHE_SIZE = 1024
+_TOOL_CACHE_TTL = 300.0  # seconds
+
+_tool_cache: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_query(query: str) -> str:
+    """Normalize a search query for use as a cache key."""
+    return _WHITESPACE_RE.sub(" ", query.strip().lower())
+
+
+async def _cached_search(name: str, query: str, search: Callable[[str], Awaitable[dict]]) -> dict:
+    """
+    Run a search tool through the in-process TTL/LRU cache.
+    
+    Only successful results are cached, so transient empty or failed
+    searches are retried on the next call. Cached dicts are shared and
+    must not be mutated.
+    """
+    query = _normalize_query(query)
+    key = (name, query)
+    now = time.monotonic()
+    
+    cached = _tool_cache.get(key)
+    if cached and cached[0] > now:
+        _tool_cache.move_to_end(key)
+        logger.debug(f"Tool cache hit: {name} '{query}'")
+        return cached[1]
+    
+    result = await search(query)
+    
+    if result["status"] == "success":
+        _tool_cache[key] = (now + _TOOL_CACHE_TTL, result)
+        _tool_cache.move_to_end(key)
+        while len(_tool_cache) > _TOOL_CACHE_SIZE:
+            _tool_cache.popitem(last=False)
+    
+    return result
+
+
+# Speculative web searches not yet claimed by a web_search call, keyed by
+# normalized query
+_web_prefetch: dict[str, asyncio.Task] = {}
+
+
+async def _prefetch_web(query: str) -> dict:
+    """Run a web search ahead of time, sharing the tool's limit and cache."""
+    try:
+        async with _get_tool_semaphore("web_search"):
+            return await _cached_search("web_search", query, _do_search)
+    except Exception as e:
+        # Nobody may ever await this task, so never leave an exception on it
+        logger.warning(f"Speculative web search failed: {e}")
+        return {"status": "error", "reason": str(e)}
+
+
+def _start_web_prefetch(query: str) -> asyncio.Task:
+    """Start (or join) a speculative web search for a normalized query."""
+    task = _web_prefetch.get(query)
+    if task is None:
+        task = asyncio.create_task(_prefetch_web(query))
+        _web_prefetch[query] = task
+        task.add_done_callback(
+            lambda t: _web_prefetch.pop(query) if _web_prefetch.get(query) is t else None
+        )
+    return task
+
+
+async def _do_rag(query: str) -> dict:
+    """
+    Search the local legal database.
+    
+    With SPECULATIVE_WEB_SEARCH, the fallback web search for the same query
+    runs concurrently and is cancelled if the top hit is confident, so a
+    follow-up web_search call finds it already in flight or cached.
+    """
+    web_task = _start_web_prefetch(query) if SPECULATIVE_WEB_SEARCH else None
+    
+    # Batched with concurrent queries and run off the event loop
+    results = await retrieve_sections_async(query)
+    
+    # Cancel the speculative search unless a web_search call already claimed it
+    if (
+        web_task is not None
+        and results
+        and results[0].get("score", 0) >= CONFIDENCE_THRESHOLD
+        and _web_prefetch.get(query) is web_task
+    ):
+        # Unregister first so no web_search call can claim a cancelled task
+        del _web_prefetch[query]
+        web_task.cancel()
+    
+    # Format results for LLM - truncate text to prevent context bloat
+    if not results:
+        return {"status": "no_results", "data": []}
+    
+    formatted = []
+    for i, r in enumerate(results[:MAX_CTX_CHUNKS], 1):
+        formatted.append({
+            "index": i,
+            "act": r.get("act_name", "Unknown"),
+            "section": r.get("section_number", ""),
+            # Precomputed prefix, see rag_engine
+            "text": r.get(TEXT_PREVIEW_FIELD, "")[:MAX_CHUNK_CHARS],
+            "score": round(r.get("score", 0), 3),
+        })
+    
+    return {"status": "success", "data": formatted}
+
+
+async def _do_search(query: str) -> dict:
+    """Search trusted legal websites."""
+    results = await web_search(query)
+    
+    if not results:
+        return {"status": "no_results", "data": []}
+    
+    formatted = [
+        {"index": i, "title": r.title, "snippet": r.snippet, "url": r.url, "domain": r.domain}
+        for i, r in enumerate(results, 1)
+    ]
+    
+    return {"status": "success", "data": formatted}
+
+
+async def _do_read(url: str) -> dict:
+    """Read a page from a trusted domain (not cached: pages can be large)."""
+    content = await read_url(url)
+    
+    if not content:
+        return {"status": "blocked", "reason": "URL not from trusted domain"}
+    
+    return {
+        "status": "success",
+        "data": {
+            "title": content.title,
+            "text": content.text[:2000],
+            "domain": content.domain,
+        }
+    }
+
+
+async def _dispatch_tool(name: str, args: dict) -> dict:
+    """Run a single tool call."""
     logger.info(f"Executing tool: {name} with args: {args}")
     
     if name == "rag_search":
-        rag = _get_rag_engine()
-        query = args.get("query", "")
-        
-        # Run synchronous RAG in thread pool to avoid blocking event loop
-        import asyncio
-        loop = asyncio.get_running_loop()
-        results = await loop.run_in_executor(None, rag["retrieve"], query)
-        
-        # Format results for LLM - truncate text to prevent context bloat
-        if not results:
-            return {"status": "no_results", "data": []}
-        
-        formatted = []
-        for i, r in enumerate(results[:3], 1):
-            formatted.append({
-                "index": i,
-                "act": r.get("act_name", "Unknown"),
-                "section": r.get("section_number", ""),
-                "text": r.get("text", "")[:800],  # Increased for better context
-                "score": round(r.get("score", 0), 3),
-            })
-        
-        return {"status": "success", "data": formatted}
+        return await _cached_search(name, args.get("query", ""), _do_rag)
     
     elif name == "web_search":
-        browser = await _get_browser()
-        query = args.get("query", "")
-        results = await browser["search"](query)
-        
-        if not results:
-            return {"status": "no_results", "data": []}
-        
-        formatted = [
-            {"index": i, "title": r.title, "snippet": r.snippet, "url": r.url, "domain": r.domain}
-            for i, r in enumerate(results, 1)
-        ]
-        
-        return {"status": "success", "data": formatted}
+        return await _cached_search(name, args.get("query", ""), _do_search)
     
     elif name == "read_url":
-        browser = await _get_browser()
-        url = args.get("url", "")
-        content = await browser["read"](url)
-        
-        if not content:
-            return {"status": "blocked", "reason": "URL not from trusted domain"}
-        
-        return {
-            "status": "success",
-            "data": {
-                "title": content.title,
-                "text": content.text[:2000],
-                "domain": content.domain,
-            }
-        }
+        return await _do_read(args.get("url", ""))
     
     else:
         return {"status": "error", "reason": f"Unknown tool: {name}"}
 
 
+async def _safe_execute_tool(name: str, args: dict) -> dict:
+    """Execute a tool, mapping any failure to an error result."""
+    try:
+        return await execute_tool(name, args)
+    except Exception as e:
+        logger.error(f"Tool execution failed: {e}")
+        return {"status": "error", "reason": str(e)}
+
+
+# Max size in tokens of a tool result fed back to the LLM
+TOOL_RESULT_TOKEN_BUDGET = 750
+
+
+def _json_tokens(obj: Any) -> int:
+    """Count tokens in the JSON serialization of an object."""
+    return count_tokens(orjson.dumps(obj).decode("utf-8"))
+
+
+def _truncate_tool_result(result: dict, token_budget: int = TOOL_RESULT_TOKEN_BUDGET) -> str:
+    """
+    Serialize a tool result for the LLM, eliding data to fit a token budget.
+    
+    Trailing list items are dropped (or page text is shortened) before
+    serializing, so the output is always valid JSON. Elided results are
+    marked with "truncated" and, for lists, the original "total" count.
+    
+    Args:
+        result: Tool result dict (not modified).
+        token_budget: Max tokens in the JSON output.
+        
+    Returns:
+        JSON string of the (possibly truncated) result.
+    """
+    encoded = orjson.dumps(result).decode("utf-8")
+    if count_tokens(encoded) <= token_budget:
+        return encoded
+    
+    data = result.get("data")
+    if isinstance(data, list):
+        trimmed = {**result, "data": [], "truncated": True, "total": len(data)}
+        used = _json_tokens(trimmed)
+        for item in data:
+            size = _json_tokens(item) + 1  # +1 for the separating comma
+            if used + size > token_budget:
+                break
+            trimmed["data"].append(item)
+            used += size
+    elif isinstance(data, dict) and isinstance(data.get("text"), str):
+        # Shorten the text in proportion to the overflow
+        text = data["text"]
+        trimmed = {**result, "data": {**data, "text": ""}, "truncated": True}
+        available = token_budget - _json_tokens(trimmed)
+        while text and (size := count_tokens(text)) > available:
+            text = text[:min(len(text) - 1, int(len(text) * max(0, available) / size))]
+        trimmed["data"]["text"] = text
+    else:
+        return encoded
+    
+    return orjson.dumps(trimmed).decode("utf-8")
+
+
+def _parse_tool_args(arguments: str) -> dict:
+    """Parse structured tool-call arguments."""
+    try:
+        return orjson.loads(arguments or "{}")
+    except orjson.JSONDecodeError:
+        return {}
+
+
+def _parse_xml_tool_args(args_str: str) -> dict:
+    """Parse arguments of an XML-style tool call with loose fallbacks."""
+    try:
+        # Try parsing JSON
+        return orjson.loads(args_str)
+    except orjson.JSONDecodeError:
+        # Clean up string and try again
+        cleaned = args_str.strip().replace("'", '"')
+        try:
+            return orjson.loads(cleaned)
+        except orjson.JSONDecodeError:
+            # Fallback
+            return {"query": args_str.strip(), "url": args_str.strip()}
+
+
 # =============================================================================
 # AGENT LOOP
 # =============================================================================
 
-async def run_agent(query: str, max_iterations: int = 5) -> dict:
+# Event callback used by the agent core (a no-op for the non-streaming API)
+Emit = Callable[[dict], None]
+
+
+def _noop_emit(event: dict) -> None:
+    """Discard an agent event."""
+
+
+_STREAM_END = object()
+
+# Answer confidence by agent mode
+_MODE_CONFIDENCE = {"grounded": "high", "hybrid": "medium", "fallback": "low", "error": "low"}
+
+
+class ToolCall(NamedTuple):
+    """A tool call made during the agent loop."""
+    name: str
+    args: dict
+    status: str
+    data: Any
+
+
+async def _run_tools(
+    calls: list[tuple[str, dict]], emit: Emit, tools_used: list[ToolCall]
+) -> list[dict]:
     """
-    Run the agentic loop with tool calling.
+    Run tool calls concurrently, emitting start/result events.
+
+    Args:
+        calls: (name, args) pairs in the order the LLM requested them.
+        emit: Event callback.
+        tools_used: Record of tool calls, appended to in order.
+
+    Returns:
+        Tool results in the same order as calls.
+    """
+    # Emit all tool start events before running the calls
+    for name, args in calls:
+        tool_info = _get_tool_info(name)
+        emit({
+            "type": "tool_start",
+            "tool": name,
+            "display_name": tool_info["name"],
+            "icon": tool_info["icon"],
+            "message": tool_info["searching"],
+            "detail": tool_info["detail"],
+            "query": args.get("query", args.get("url", ""))
+        })
     
+    results = await asyncio.gather(
+        *(_safe_execute_tool(name, args) for name, args in calls)
+    )
+    
+    for (name, args), result in zip(calls, results):
+        tool_info = _get_tool_info(name)
+        
+        # Count results
+        result_count = 0
+        if result.get("status") == "success":
+            data = result.get("data", [])
+            result_count = len(data) if isinstance(data, list) else 1
+        
+        emit({
+            "type": "tool_result",
+            "tool": name,
+            "display_name": tool_info["name"],
+            "icon": "✓" if result["status"] == "success" else "✗",
+            "status": result["status"],
+            "count": result_count,
+            "message": (
+                f"Found {result_count} results" if result["status"] == "success" else "No results"
+            ),
+        })
+        
+        # Include data in tools_used so callers can extract sources
+        tools_used.append(ToolCall(name, args, result["status"], result.get("data")))
+    
+    return results
+
+
+def extract_sources(
+    tools_used: list[ToolCall], text_chars: int = 300
+) -> tuple[list[dict], list[dict]]:
+    """
+    Collect local and web sources from successful tool calls in one pass.
+    
+    The same section or URL found in several iterations is listed once.
+    
+    Args:
+        tools_used: Tool calls made by the agent.
+        text_chars: Max characters of section text to include.
+        
     Returns:
-        dict with answer, tools_used, tokens
+        Tuple of (local_sources, web_sources).
+    """
+    local_sources = []
+    web_sources = []
+    seen_local: set[tuple[str, str]] = set()
+    seen_web: set[str] = set()
+    
+    for tool in tools_used:
+        if tool.status != "success" or not isinstance(tool.data, list):
+            continue
+        
+        if tool.name == "rag_search":
+            for item in tool.data:
+                act = item.get("act", "Unknown")
+                section = str(item.get("section", ""))
+                if (act, section) in seen_local:
+                    continue
+                seen_local.add((act, section))
+                local_sources.append({
+                    "act": act,
+                    "section": section,
+                    "text": item.get("text", "")[:text_chars],
+                    "score": item.get("score", 0)
+                })
+        
+        elif tool.name == "web_search":
+            for item in tool.data:
+                url = item.get("url", "")
+                if url in seen_web:
+                    continue
+                seen_web.add(url)
+                web_sources.append({
+                    "url": url,
+                    "title": item.get("title", ""),
+                    "domain": item.get("domain", "")
+                })
+    
+    return local_sources, web_sources
+
+
+async def _run_agent_core(query: str, max_iterations: int, emit: Emit) -> dict:
+    """
+    Run the agentic loop with tool calling, reporting progress through emit.
+    
+    Shared by run_agent and run_agent_streaming.
+    
+    Args:
+        query: User's question (already sanitized).
+        max_iterations: Maximum LLM round-trips.
+        emit: Callback receiving each status/tool/answer event.
+    
+    Returns:
+        dict with answer, mode, confidence, tools_used, tokens
     """
     if not GROQ_API_KEY:
+        emit({"type": "error", "message": "API key not configured"})
         return {
             "answer": "API key not configured.",
             "mode": "error",
+            "confidence": "low",
+            "tools_used": [],
+            "tokens_in": 0,
+            "tokens_out": 0,
+        }
+    
+    # Plain greetings need no tools or LLM call
+    reply = _greeting_reply(query)
+    if reply:
+        emit({
+            "type": "answer",
+            "text": reply,
+            "mode": "fallback",
+            "confidence": "low",
+            "tokens_in": 0,
+            "tokens_out": 0
+        })
+        return {
+            "answer": reply,
+            "mode": "fallback",
+            "confidence": "low",
             "tools_used": [],
             "tokens_in": 0,
             "tokens_out": 0,
         }
     
-    client = Groq(api_key=GROQ_API_KEY)
+    # A recent answer to a near-identical question is replayed as is
+    cached = await get_cached_answer(query)
+    if cached is not None:
+        logger.debug("Answer served from semantic cache")
+        local_sources, web_sources = extract_sources(cached["tools_used"])
+        if local_sources or web_sources:
+            emit({
+                "type": "sources",
+                "local": local_sources,
+                "web": web_sources
+            })
+        emit({
+            "type": "answer",
+            "text": cached["answer"],
+            "mode": cached["mode"],
+            "confidence": cached["confidence"],
+            "tokens_in": 0,
+            "tokens_out": 0
+        })
+        return {**cached, "tokens_in": 0, "tokens_out": 0}
+    
+    # Initial status
+    emit({
+        "type": "status",
+        "message": "Understanding your question",
+        "icon": "🤔",
+        "detail": query[:100] + "..." if len(query) > 100 else query
+    })
+    
     messages = [
         {"role": "system", "content": AGENT_SYSTEM_PROMPT},
         {"role": "user", "content": query},
     ]
     
-    tools_used = []
+    tools_used: list[ToolCall] = []
     total_tokens_in = 0
     total_tokens_out = 0
     
     for iteration in range(max_iterations):
         logger.debug(f"Agent iteration {iteration + 1}/{max_iterations}")
         
+        # Keep the conversation within the input-token budget
+        messages = fit_messages(messages)
+        
+        # Show thinking status
+        if iteration > 0:
+            emit({
+                "type": "thinking",
+                "message": f"Analyzing results (step {iteration + 1})",
+                "icon": "💭"
+            })
+        
         try:
             # Force tool use on first iteration for legal questions
-            # This ensures RAG is always consulted first
+            # This ensures RAG is always consulted first, even when that is
+            # the only iteration. On a later last iteration tools are
+            # disabled: a tool call there could never be followed by an
+            # answer, so the round-trip would be wasted.
             if iteration == 0 and not _is_greeting(query):
                 current_tool_choice = {"type": "function", "function": {"name": "rag_search"}}
+            elif iteration == max_iterations - 1:
+                current_tool_choice = "none"
             else:
                 current_tool_choice = "auto"
             
-            response = client.chat.completions.create(
+            stream = _stream_completion(
                 model=GROQ_MODEL,
                 messages=messages,
                 tools=TOOLS,
@@ -186,98 +717,91 @@ async def run_agent(query: str, max_iterations: int = 5) -> dict:
                 max_tokens=2048,
             )
             
+            # Forward answer text as it arrives. Hold it back until the first
+            # visible character: XML-style tool calls start with a tag and
+            # must not be shown as answer text. Forced tool turns never
+            # carry the answer, and text stops once a tool call shows up.
+            turn = _StreamedTurn()
+            pending = []
+            forward_text = False if isinstance(current_tool_choice, dict) else None
+            streamed_text = False
+            async for chunk in stream:
+                delta = turn.add(chunk)
+                if turn.tool_calls:
+                    forward_text = False
+                if not delta:
+                    continue
+                if forward_text is None:
+                    pending.append(delta)
+                    head = "".join(pending).lstrip()
+                    if not head:
+                        continue
+                    forward_text = not head.startswith("<")
+                    if forward_text:
+                        emit({"type": "answer_delta", "text": "".join(pending)})
+                        streamed_text = True
+                elif forward_text:
+                    emit({"type": "answer_delta", "text": delta})
+            
             # Track tokens
-            if response.usage:
-                total_tokens_in += response.usage.prompt_tokens
-                total_tokens_out += response.usage.completion_tokens
+            if turn.usage:
+                total_tokens_in += turn.usage.prompt_tokens
+                total_tokens_out += turn.usage.completion_tokens
             
-            message = response.choices[0].message
+            message = turn.message()
             
             # Check if LLM wants to call tools (Structured)
             if message.tool_calls:
-                # ... existing structured handling ...
-                messages.append({
-                    "role": "assistant",
-                    "content": message.content or "",
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments,
-                            }
-                        }
+                if streamed_text:
+                    # The text was a preamble to the tool call, not the answer
+                    emit({"type": "answer_reset"})
+                messages.append(message.model_dump(exclude_none=True, exclude={"function_call"}))
+                
+                results = await _run_tools(
+                    [
+                        (tc.function.name, _parse_tool_args(tc.function.arguments))
                         for tc in message.tool_calls
-                    ]
-                })
+                    ],
+                    emit,
+                    tools_used,
+                )
                 
-                for tool_call in message.tool_calls:
-                    name = tool_call.function.name
-                    try:
-                        args = json.loads(tool_call.function.arguments)
-                    except:
-                        args = {}
-                    
-                    try:
-                        result = await execute_tool(name, args)
-                    except Exception as e:
-                        logger.error(f"Tool execution failed: {e}")
-                        result = {"status": "error", "reason": str(e)}
-                    tools_used.append({"name": name, "args": args, "result": result["status"], "data": result.get("data")})
-                    
+                for tool_call, result in zip(message.tool_calls, results):
                     # Truncate tool result to prevent context bloat
-                    result_str = json.dumps(result, ensure_ascii=False)
-                    if len(result_str) > 3000:
-                        result_str = result_str[:3000] + '..."}'
-                    
                     messages.append({
                         "role": "tool",
                         "tool_call_id": tool_call.id,
-                        "content": result_str,
+                        "content": _truncate_tool_result(result),
                     })
                 continue
             
-            # Check for XML-style tool calls (Fallback with loose Regex)
+            # Check for XML-style tool calls (Fallback with loose Regex).
+            # A turn that stopped normally without any tag is a final answer.
             content = message.content or ""
-            import re
             
-            tool_matches = []
-            for tool_def in TOOLS:
-                t_name = tool_def["function"]["name"]
-                # Match <t_name>... and any closing tag or just end of string
-                # This handles <rag_search>...{"query": "..."}</function> or </rag_search>
-                pattern = f"<{t_name}>(.*?)(?:</{t_name}>|</function>|$)"
-                matches = re.finditer(pattern, content, re.DOTALL | re.IGNORECASE)
-                for m in matches:
-                    tool_matches.append((t_name, m.group(1)))
+            if turn.finish_reason == "stop" and "<" not in content:
+                tool_matches = []
+            else:
+                tool_matches = [
+                    (t_name, m.group(1))
+                    for t_name, pattern in _TOOL_XML_PATTERNS
+                    for m in pattern.finditer(content)
+                ]
             
             if tool_matches:
+                if streamed_text:
+                    emit({"type": "answer_reset"})
+                
                 # Add assistant message
                 messages.append({"role": "assistant", "content": content})
                 
-                tool_results = []
-                for name, args_str in tool_matches:
-                    try:
-                        # Try parsing JSON
-                        args = json.loads(args_str)
-                    except:
-                        # Clean up string and try again
-                        cleaned = args_str.strip().replace("'", '"')
-                        try:
-                            args = json.loads(cleaned)
-                        except:
-                            # Fallback
-                            args = {"query": args_str.strip(), "url": args_str.strip()}
-                    
-                    try:
-                        result = await execute_tool(name, args)
-                    except Exception as e:
-                        logger.error(f"Tool execution failed: {e}")
-                        result = {"status": "error", "reason": str(e)}
-                    # Include data in tools_used so main.py can extract sources
-                    tools_used.append({"name": name, "args": args, "result": result["status"], "data": result.get("data")})
-                    tool_results.append(f"Result of {name}: {json.dumps(result, ensure_ascii=False)}")
+                calls = [(name, _parse_xml_tool_args(args_str)) for name, args_str in tool_matches]
+                results = await _run_tools(calls, emit, tools_used)
+                
+                tool_results = [
+                    f"Result of {name}: {_truncate_tool_result(result)}"
+                    for (name, _), result in zip(calls, results)
+                ]
                 
                 # Feed results back
                 messages.append({
@@ -288,44 +812,99 @@ async def run_agent(query: str, max_iterations: int = 5) -> dict:
 
             else:
                 # No tool calls - LLM is done
+                emit({
+                    "type": "status",
+                    "message": "Generating response",
+                    "icon": "✍️"
+                })
+                
                 answer = message.content or "I couldn't generate a response."
                 
-                # Determine mode based on tools used
-                if any(t["name"] == "web_search" for t in tools_used):
-                    mode = "hybrid"
-                elif any(t["name"] == "rag_search" for t in tools_used):
-                    mode = "grounded"
-                else:
-                    mode = "fallback"
+                # Determine mode and confidence based on tools used
+                tool_names = {t.name for t in tools_used}
+                mode = (
+                    "hybrid" if "web_search" in tool_names
+                    else "grounded" if "rag_search" in tool_names
+                    else "fallback"
+                )
+                confidence = _MODE_CONFIDENCE[mode]
                 
-                return {
+                # Emit sources
+                local_sources, web_sources = extract_sources(tools_used)
+                if local_sources or web_sources:
+                    emit({
+                        "type": "sources",
+                        "local": local_sources,
+                        "web": web_sources
+                    })
+                
+                # Emit final answer
+                emit({
+                    "type": "answer",
+                    "text": answer,
+                    "mode": mode,
+                    "confidence": confidence,
+                    "tokens_in": total_tokens_in,
+                    "tokens_out": total_tokens_out
+                })
+                
+                result = {
                     "answer": answer,
                     "mode": mode,
+                    "confidence": confidence,
                     "tools_used": tools_used,
                     "tokens_in": total_tokens_in,
                     "tokens_out": total_tokens_out,
                 }
+                if message.content:
+                    await cache_answer(query, result)
+                return result
         
         except Exception as e:
             logger.error(f"Agent error: {e}")
+            emit({
+                "type": "error",
+                "message": str(e)
+            })
             return {
                 "answer": f"An error occurred: {str(e)}",
                 "mode": "error",
+                "confidence": "low",
                 "tools_used": tools_used,
                 "tokens_in": total_tokens_in,
                 "tokens_out": total_tokens_out,
             }
     
     # Max iterations reached
+    answer = "I couldn't complete the request within the allowed steps."
+    emit({
+        "type": "answer",
+        "text": answer,
+        "mode": "fallback",
+        "confidence": "low",
+        "tokens_in": total_tokens_in,
+        "tokens_out": total_tokens_out
+    })
     return {
-        "answer": "I couldn't complete the request within the allowed steps.",
+        "answer": answer,
         "mode": "fallback",
+        "confidence": "low",
         "tools_used": tools_used,
         "tokens_in": total_tokens_in,
         "tokens_out": total_tokens_out,
     }
 
 
+async def run_agent(query: str, max_iterations: int = 5) -> dict:
+    """
+    Run the agentic loop with tool calling.
+    
+    Returns:
+        dict with answer, tools_used, tokens
+    """
+    return await _run_agent_core(query, max_iterations, _noop_emit)
+
+
 # =============================================================================
 # STREAMING AGENT (for live status updates)
 # =============================================================================
@@ -339,299 +918,24 @@ async def run_agent_streaming(query: str, max_iterations: int = 5) -> AsyncGener
     - {"type": "tool_start", "tool": "rag_search", "query": "..."}
     - {"type": "tool_result", "tool": "...", "status": "success", "count": N}
     - {"type": "thinking", "message": "..."}
+    - {"type": "answer_delta", "text": "..."}  (partial answer text as it is generated)
+    - {"type": "answer_reset"}  (discard the deltas so far; they preceded a tool call)
     - {"type": "answer", "text": "...", "mode": "...", "confidence": "..."}
     - {"type": "sources", "local": [...], "web": [...]}
     """
-    if not GROQ_API_KEY:
-        yield {"type": "error", "message": "API key not configured"}
-        return
+    queue: asyncio.Queue = asyncio.Queue()
     
-    # Initial status
-    yield {
-        "type": "status",
-        "message": "Understanding your question",
-        "icon": "🤔",
-        "detail": query[:100] + "..." if len(query) > 100 else query
-    }
-    
-    client = Groq(api_key=GROQ_API_KEY)
-    messages = [
-        {"role": "system", "content": AGENT_SYSTEM_PROMPT},
-        {"role": "user", "content": query},
-    ]
-    
-    tools_used = []
-    total_tokens_in = 0
-    total_tokens_out = 0
-    
-    for iteration in range(max_iterations):
-        logger.debug(f"Agent iteration {iteration + 1}/{max_iterations}")
-        
-        # Show thinking status
-        if iteration > 0:
-            yield {
-                "type": "thinking",
-                "message": f"Analyzing results (step {iteration + 1})",
-                "icon": "💭"
-            }
-        
+    async def produce() -> None:
         try:
-            # Force tool use on first iteration for legal questions
-            if iteration == 0 and not _is_greeting(query):
-                current_tool_choice = {"type": "function", "function": {"name": "rag_search"}}
-            else:
-                current_tool_choice = "auto"
-            
-            response = client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=messages,
-                tools=TOOLS,
-                tool_choice=current_tool_choice,
-                temperature=0.1,
-                max_tokens=2048,
-            )
-            
-            if response.usage:
-                total_tokens_in += response.usage.prompt_tokens
-                total_tokens_out += response.usage.completion_tokens
-            
-            message = response.choices[0].message
-            
-            # Handle tool calls
-            if message.tool_calls:
-                messages.append({
-                    "role": "assistant",
-                    "content": message.content or "",
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments,
-                            }
-                        }
-                        for tc in message.tool_calls
-                    ]
-                })
-                
-                for tool_call in message.tool_calls:
-                    name = tool_call.function.name
-                    try:
-                        args = json.loads(tool_call.function.arguments)
-                    except:
-                        args = {}
-                    
-                    # Get tool display info
-                    tool_info = TOOL_DISPLAY_INFO.get(name, {
-                        "name": name, "icon": "🔧", "searching": f"Running {name}", "detail": ""
-                    })
-                    
-                    # Emit tool start event
-                    yield {
-                        "type": "tool_start",
-                        "tool": name,
-                        "display_name": tool_info["name"],
-                        "icon": tool_info["icon"],
-                        "message": tool_info["searching"],
-                        "detail": tool_info["detail"],
-                        "query": args.get("query", args.get("url", ""))
-                    }
-                    
-                    try:
-                        result = await execute_tool(name, args)
-                    except Exception as e:
-                        logger.error(f"Tool execution failed: {e}")
-                        result = {"status": "error", "reason": str(e)}
-                    
-                    # Count results
-                    result_count = 0
-                    if result.get("status") == "success":
-                        data = result.get("data", [])
-                        result_count = len(data) if isinstance(data, list) else 1
-                    
-                    # Emit tool result event
-                    yield {
-                        "type": "tool_result",
-                        "tool": name,
-                        "display_name": tool_info["name"],
-                        "icon": "✓" if result["status"] == "success" else "✗",
-                        "status": result["status"],
-                        "count": result_count,
-                        "message": f"Found {result_count} results" if result["status"] == "success" else "No results"
-                    }
-                    
-                    tools_used.append({
-                        "name": name, 
-                        "args": args, 
-                        "result": result["status"], 
-                        "data": result.get("data")
-                    })
-                    
-                    result_str = json.dumps(result, ensure_ascii=False)
-                    if len(result_str) > 3000:
-                        result_str = result_str[:3000] + '..."}'
-                    
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": result_str,
-                    })
-                continue
-            
-            # Handle XML-style tool calls (fallback)
-            content = message.content or ""
-            import re
-            
-            tool_matches = []
-            for tool_def in TOOLS:
-                t_name = tool_def["function"]["name"]
-                pattern = f"<{t_name}>(.*?)(?:</{t_name}>|</function>|$)"
-                matches = re.finditer(pattern, content, re.DOTALL | re.IGNORECASE)
-                for m in matches:
-                    tool_matches.append((t_name, m.group(1)))
-            
-            if tool_matches:
-                messages.append({"role": "assistant", "content": content})
-                
-                tool_results = []
-                for name, args_str in tool_matches:
-                    try:
-                        args = json.loads(args_str)
-                    except:
-                        cleaned = args_str.strip().replace("'", '"')
-                        try:
-                            args = json.loads(cleaned)
-                        except:
-                            args = {"query": args_str.strip(), "url": args_str.strip()}
-                    
-                    tool_info = TOOL_DISPLAY_INFO.get(name, {
-                        "name": name, "icon": "🔧", "searching": f"Running {name}", "detail": ""
-                    })
-                    
-                    yield {
-                        "type": "tool_start",
-                        "tool": name,
-                        "display_name": tool_info["name"],
-                        "icon": tool_info["icon"],
-                        "message": tool_info["searching"],
-                        "query": args.get("query", args.get("url", ""))
-                    }
-                    
-                    try:
-                        result = await execute_tool(name, args)
-                    except Exception as e:
-                        logger.error(f"Tool execution failed: {e}")
-                        result = {"status": "error", "reason": str(e)}
-                    
-                    result_count = len(result.get("data", [])) if isinstance(result.get("data"), list) else (1 if result.get("data") else 0)
-                    
-                    yield {
-                        "type": "tool_result",
-                        "tool": name,
-                        "status": result["status"],
-                        "count": result_count
-                    }
-                    
-                    tools_used.append({
-                        "name": name,
-                        "args": args,
-                        "result": result["status"],
-                        "data": result.get("data")
-                    })
-                    tool_results.append(f"Result of {name}: {json.dumps(result, ensure_ascii=False)}")
-                
-                messages.append({
-                    "role": "user",
-                    "content": "Tool Output:\n" + "\n".join(tool_results) + "\n\nBased on these results, please provide the final answer."
-                })
-                continue
-            
-            else:
-                # Final answer - LLM is done
-                yield {
-                    "type": "status",
-                    "message": "Generating response",
-                    "icon": "✍️"
-                }
-                
-                answer = message.content or "I couldn't generate a response."
-                
-                # Determine mode
-                if any(t["name"] == "web_search" for t in tools_used):
-                    mode = "hybrid"
-                elif any(t["name"] == "rag_search" for t in tools_used):
-                    mode = "grounded"
-                else:
-                    mode = "fallback"
-                
-                # Confidence
-                if mode == "grounded":
-                    confidence = "high"
-                elif mode == "hybrid":
-                    confidence = "medium"
-                else:
-                    confidence = "low"
-                
-                # Extract sources
-                local_sources = []
-                web_sources = []
-                
-                for tool in tools_used:
-                    if tool["name"] == "rag_search" and tool.get("result") == "success":
-                        data = tool.get("data", [])
-                        if isinstance(data, list):
-                            for item in data:
-                                local_sources.append({
-                                    "act": item.get("act", "Unknown"),
-                                    "section": str(item.get("section", "")),
-                                    "text": item.get("text", "")[:300],
-                                    "score": item.get("score", 0)
-                                })
-                    
-                    elif tool["name"] == "web_search" and tool.get("result") == "success":
-                        data = tool.get("data", [])
-                        if isinstance(data, list):
-                            for item in data:
-                                web_sources.append({
-                                    "url": item.get("url", ""),
-                                    "title": item.get("title", ""),
-                                    "domain": item.get("domain", "")
-                                })
-                
-                # Emit sources
-                if local_sources or web_sources:
-                    yield {
-                        "type": "sources",
-                        "local": local_sources,
-                        "web": web_sources
-                    }
-                
-                # Emit final answer
-                yield {
-                    "type": "answer",
-                    "text": answer,
-                    "mode": mode,
-                    "confidence": confidence,
-                    "tokens_in": total_tokens_in,
-                    "tokens_out": total_tokens_out
-                }
-                return
-        
-        except Exception as e:
-            logger.error(f"Agent error: {e}")
-            yield {
-                "type": "error",
-                "message": str(e)
-            }
-            return
+            await _run_agent_core(query, max_iterations, queue.put_nowait)
+        finally:
+            queue.put_nowait(_STREAM_END)
     
-    # Max iterations reached
-    yield {
-        "type": "answer",
-        "text": "I couldn't complete the request within the allowed steps.",
-        "mode": "fallback",
-        "confidence": "low",
-        "tokens_in": total_tokens_in,
-        "tokens_out": total_tokens_out
-    }
+    task = asyncio.create_task(produce())
+    try:
+        while (event := await queue.get()) is not _STREAM_END:
+            yield event
+        await task  # Surface any error raised by the core
+    finally:
+        # Stop the agent if the client went away mid-stream
+        task.cancel()
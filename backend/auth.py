@@ -4,6 +4,7 @@ Authentication middleware for Nyay Sathi API.
 Handles Bearer token validation to secure the endpoints.
 """
 
+import hmac
 from typing import Optional
 
 from fastapi import HTTPException, Security, status
@@ -15,6 +16,19 @@ from logger import app_logger as logger
 # Bearer token scheme
 security = HTTPBearer()
 
+# Keys as bytes for hmac.compare_digest (str input must be ASCII-only)
+_API_KEY_BYTES: tuple[bytes, ...] = tuple(k.encode("utf-8") for k in API_SECRET_KEYS)
+
+
+def _is_valid_key(token: str) -> bool:
+    """Check a token against every configured key in constant time per key."""
+    token_bytes = token.encode("utf-8")
+    valid = False
+    for key in _API_KEY_BYTES:
+        # No short-circuit, so timing doesn't reveal which key matched
+        valid |= hmac.compare_digest(token_bytes, key)
+    return valid
+
 
 def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
     """
@@ -39,7 +53,7 @@ def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security
             detail="Server configuration error: No API keys defined",
         )
 
-    if token not in API_SECRET_KEYS:
+    if not _is_valid_key(token):
         logger.warning(f"Invalid API key attempt: {token[:4]}***")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -6,20 +6,48 @@ Strict whitelist enforcement for trusted domains only.
 """
 
 import asyncio
-from urllib.parse import urlparse, quote_plus
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Final
+from urllib.parse import parse_qs, urlparse
 
 import httpx
+import orjson
 from dataclasses import dataclass
+from functools import lru_cache
 
+from config import (
+    INDIANKANOON_API_TOKEN,
+    WEB_FETCH_CONCURRENCY,
+    WEB_FETCH_PER_HOST,
+    WEB_FETCH_QUEUE_TIMEOUT,
+    WEB_KEEPALIVE_EXPIRY,
+    WEB_MAX_CONNECTIONS,
+    WEB_MAX_KEEPALIVE,
+)
 from logger import rag_logger as logger
 from sanitizer import sanitize_web_content
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    # Fall back to regex tag stripping
+    HTMLParser = None
+
 
 # =============================================================================
 # TRUSTED DOMAINS - WHITELIST ONLY
 # =============================================================================
 
-TRUSTED_DOMAINS = {
+TRUSTED_DOMAINS: frozenset[str] = frozenset({
     # Government
     "indiacode.nic.in",
     "legislative.gov.in",
@@ -36,8 +64,154 @@ TRUSTED_DOMAINS = {
     
     # Encyclopedia
     "en.wikipedia.org",
+})
+
+# Parents whose subdomains are trusted: every trusted domain, plus any
+# gov.in or nic.in host
+_TRUSTED_PARENTS: frozenset[str] = TRUSTED_DOMAINS | {"gov.in", "nic.in"}
+
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 }
 
+# Ask only for the document itself; sub-resources are never fetched, and
+# servers that negotiate content serve HTML/JSON instead of other formats
+_HTML_ACCEPT = {"Accept": "text/html,application/xhtml+xml;q=0.9,text/*;q=0.5"}
+_JSON_ACCEPT = {"Accept": "application/json"}
+
+# Failures of a single search or page read: network/HTTP errors, bad JSON
+# (ValueError) or an unexpected payload shape (AttributeError). Anything
+# else is a bug, and cancellation must propagate.
+_WEB_ERRORS = (httpx.HTTPError, ValueError, AttributeError)
+
+_SEARCH_HOST_URL = "https://searx.be/"
+
+# Appended to every general web search query; fixed so identical questions
+# produce identical search URLs
+_SITE_FILTER: Final[str] = "site:gov.in OR site:indiankanoon.org"
+
+# Shared client so search and page reads reuse pooled (and, with h2
+# installed, multiplexed HTTP/2) connections
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=15.0,
+            headers=_HEADERS,
+            limits=httpx.Limits(
+                max_connections=WEB_MAX_CONNECTIONS,
+                max_keepalive_connections=WEB_MAX_KEEPALIVE,
+                keepalive_expiry=WEB_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+# Bound concurrent outbound requests in total and per host; created lazily
+# inside the event loop. Only search providers and trusted domains are ever
+# fetched, so the per-host map stays small.
+_fetch_semaphore: asyncio.Semaphore | None = None
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+def _get_fetch_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent outbound requests."""
+    global _fetch_semaphore
+    if _fetch_semaphore is None:
+        _fetch_semaphore = asyncio.Semaphore(WEB_FETCH_CONCURRENCY)
+    return _fetch_semaphore
+
+
+def _get_host_semaphore(url: str) -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent requests to one host."""
+    host = urlparse(url).hostname or ""
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(WEB_FETCH_PER_HOST)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def _fetch_slot(semaphore: asyncio.Semaphore, url: str) -> AsyncIterator[None]:
+    """Hold a fetch slot, giving up after WEB_FETCH_QUEUE_TIMEOUT seconds of waiting."""
+    if not semaphore.locked():
+        # A free slot is taken without suspending, so nothing can interrupt it
+        await semaphore.acquire()
+    else:
+        # Wait on a separate task rather than wait_for(), which can drop a slot
+        # granted just as the timeout fires. Cancelling a pending acquire
+        # leaves the count intact; a finished one has to be given back.
+        acquire = asyncio.ensure_future(semaphore.acquire())
+        try:
+            await asyncio.wait({acquire}, timeout=WEB_FETCH_QUEUE_TIMEOUT)
+        except BaseException:
+            if not acquire.cancel():
+                semaphore.release()
+            raise
+        if acquire.cancel():
+            raise httpx.PoolTimeout(f"No free fetch slot for {url}")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+async def _warm_up_host(url: str) -> bool:
+    """Open a pooled connection to one host (only the handshake matters)."""
+    try:
+        await _get_client().head(url, timeout=5.0)
+        return True
+    except httpx.HTTPError as e:
+        logger.warning(f"Web client warm-up failed for {url}: {e}")
+        return False
+
+
+async def warm_up_client() -> None:
+    """
+    Create the shared HTTP client and pre-connect to every search host.
+    
+    Called at application startup so the first web search, which queries
+    all enabled providers at once, doesn't pay for their TCP/TLS handshakes.
+    Failures are only logged.
+    """
+    urls = [DDG_HTML_URL, _SEARCH_HOST_URL]
+    if INDIANKANOON_API_TOKEN:
+        urls.insert(0, INDIANKANOON_SEARCH_URL)
+    
+    warmed = await asyncio.gather(*(_warm_up_host(url) for url in urls))
+    logger.info(f"Web client warmed up ({sum(warmed)}/{len(urls)} search hosts)")
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client (call at application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def _fetch(url: str, method: str = "GET", **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """
+    Open a streamed request on the shared client.
+    
+    At most WEB_FETCH_CONCURRENCY requests are open at once, and at most
+    WEB_FETCH_PER_HOST to any one host; waiting longer than
+    WEB_FETCH_QUEUE_TIMEOUT for a slot raises httpx.PoolTimeout. The response
+    is always closed and its connection returned to the pool on exit,
+    including on errors, timeouts and task cancellation.
+    """
+    async with _fetch_slot(_get_host_semaphore(url), url), _fetch_slot(_get_fetch_semaphore(), url):
+        async with _get_client().stream(method, url, **kwargs) as response:
+            yield response
+
 
 @dataclass
 class SearchResult:
@@ -58,106 +232,340 @@ class PageContent:
     domain: str
 
 
-def is_trusted_domain(url: str) -> bool:
-    """Check if URL is from a trusted domain."""
+@lru_cache(maxsize=4096)
+def _domain_trusted(hostname: str) -> bool:
+    """Check a lowercased hostname against the whitelist (cached per host)."""
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+    if hostname in TRUSTED_DOMAINS:
+        return True
+
+    # Walk proper label suffixes (a.b.gov.in -> b.gov.in -> gov.in): one
+    # hashed lookup per label instead of a scan over every trusted suffix
+    labels = hostname.split(".")
+    return any(".".join(labels[i:]) in _TRUSTED_PARENTS for i in range(1, len(labels) - 1))
+
+
+@lru_cache(maxsize=8192)
+def _trusted_netloc(url: str) -> str | None:
+    """
+    Parse a URL once; return its netloc if the host is trusted, else None.
+    
+    Cached per URL, since the same result pages come back across searches.
+    """
+    if not url:
+        return None
     try:
-        domain = urlparse(url).netloc.lower()
-        if domain.startswith("www."):
-            domain = domain[4:]
+        parsed = urlparse(url)
+        # hostname drops any port or userinfo and is lowercased
+        hostname = parsed.hostname
+    except ValueError:
+        return None
+    
+    if hostname and _domain_trusted(hostname):
+        return parsed.netloc
+    return None
+
+
+def is_trusted_domain(url: str) -> bool:
+    """Check if URL is from a trusted domain (or a subdomain of one)."""
+    return _trusted_netloc(url) is not None
+
+
+INDIANKANOON_SEARCH_URL = "https://api.indiankanoon.org/search/"
+
+
+async def _search_indiankanoon(
+    query: str, max_results: int, skip_urls: set[str]
+) -> list[SearchResult]:
+    """Search Indian Kanoon's own API (no general search engine involved)."""
+    async with _fetch(
+        INDIANKANOON_SEARCH_URL,
+        method="POST",
+        params={"formInput": query, "pagenum": 0},
+        headers={**_JSON_ACCEPT, "Authorization": f"Token {INDIANKANOON_API_TOKEN}"},
+    ) as response:
+        if response.status_code != 200:
+            logger.warning(f"Indian Kanoon API returned {response.status_code}")
+            return []
+        data = orjson.loads(await response.aread())
+    
+    # Titles and headlines carry <b> highlight markup
+    return [
+        SearchResult(
+            url=f"https://indiankanoon.org/doc/{doc['tid']}/",
+            title=_TAG_RE.sub("", doc.get("title", ""))[:100],
+            snippet=_TAG_RE.sub("", doc.get("headline", ""))[:300],
+            domain="indiankanoon.org",
+            source="indiankanoon",
+        )
+        for doc in data.get("docs", [])[:max_results]
+        if doc.get("tid") and f"https://indiankanoon.org/doc/{doc['tid']}/" not in skip_urls
+    ]
+
+
+DDG_HTML_URL = "https://html.duckduckgo.com/html/"
+
+
+def _unwrap_ddg_link(href: str) -> str:
+    """Get the target URL from a DuckDuckGo redirect link."""
+    if href.startswith("//"):
+        href = "https:" + href
+    parsed = urlparse(href)
+    if (parsed.hostname or "").endswith("duckduckgo.com") and parsed.path.startswith("/l/"):
+        return parse_qs(parsed.query).get("uddg", [""])[0]
+    return href
+
+
+async def _search_ddg(query: str, max_results: int, skip_urls: set[str]) -> list[SearchResult]:
+    """Search DuckDuckGo's plain-HTML endpoint (no JavaScript needed)."""
+    if HTMLParser is None:
+        return []
+    
+    async with _fetch(
+        DDG_HTML_URL,
+        params={"q": f"{query} {_SITE_FILTER}"},
+        headers=_HTML_ACCEPT,
+    ) as response:
+        if response.status_code != 200:
+            logger.warning(f"DuckDuckGo returned {response.status_code}")
+            return []
+        html = (await response.aread()).decode(response.encoding or "utf-8", errors="replace")
+    
+    results = []
+    for node in HTMLParser(html).css("div.result"):
+        link = node.css_first("a.result__a")
+        if link is None:
+            continue
+        url = _unwrap_ddg_link(link.attributes.get("href") or "")
+        if url in skip_urls or not (netloc := _trusted_netloc(url)):
+            continue
         
-        # Allow any gov.in or nic.in
-        if domain.endswith(".gov.in") or domain.endswith(".nic.in"):
-            return True
+        snippet = node.css_first(".result__snippet")
+        results.append(SearchResult(
+            url=url,
+            title=link.text(strip=True)[:100],
+            snippet=snippet.text(strip=True)[:300] if snippet else "",
+            domain=netloc,
+            source="duckduckgo",
+        ))
         
-        # Check whitelist
-        for trusted in TRUSTED_DOMAINS:
-            if trusted in domain:
-                return True
-        return False
-    except:
-        return False
+        if len(results) >= max_results:
+            break
+    
+    return results
 
 
-async def web_search(query: str, max_results: int = 3) -> list[SearchResult]:
-    """
-    Search the web using SearXNG public API (no browser needed).
-    Falls back gracefully if search fails.
-    """
+async def _search_searxng(query: str, max_results: int, skip_urls: set[str]) -> list[SearchResult]:
+    """Search the web using SearXNG public API (no browser needed)."""
     results = []
     
     # Use SearXNG public instance
-    encoded_query = quote_plus(f"{query} site:gov.in OR site:indiankanoon.org")
-    search_url = f"https://searx.be/search?q={encoded_query}&format=json&categories=general"
+    async with _fetch(
+        f"{_SEARCH_HOST_URL}search",
+        params={"q": f"{query} {_SITE_FILTER}", "format": "json", "categories": "general"},
+        headers=_JSON_ACCEPT,
+    ) as response:
+        if response.status_code != 200:
+            logger.warning(f"Search API returned {response.status_code}")
+            return results
+        # Decode the whole result list in one C-level pass
+        data = orjson.loads(await response.aread())
+    
+    # The site: filter already narrows results, so few are discarded
+    for item in data.get("results", [])[:max_results * 2]:
+        url = item.get("url", "")
+        if url in skip_urls or not (netloc := _trusted_netloc(url)):
+            continue
+        
+        results.append(SearchResult(
+            url=url,
+            title=item.get("title", "")[:100],
+            snippet=item.get("content", "")[:300],
+            domain=netloc,
+            source="web_search"
+        ))
+        
+        if len(results) >= max_results:
+            break
     
+    return results
+
+
+async def _run_search(name: str, search: Any, query: str, max_results: int) -> list[SearchResult]:
+    """Run one search provider, logging and swallowing its failures."""
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(search_url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            })
-            
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get("results", [])[:max_results * 3]:
-                    url = item.get("url", "")
-                    if not is_trusted_domain(url):
-                        continue
-                    
-                    results.append(SearchResult(
-                        url=url,
-                        title=item.get("title", "")[:100],
-                        snippet=item.get("content", "")[:300],
-                        domain=urlparse(url).netloc,
-                        source="web_search"
-                    ))
-                    
-                    if len(results) >= max_results:
-                        break
-                
-                logger.info(f"Web search found {len(results)} trusted results")
-            else:
-                logger.warning(f"Search API returned {response.status_code}")
-                
-    except Exception as e:
-        logger.error(f"Web search error: {e}")
+        return await search(query, max_results, set())
+    except _WEB_ERRORS as e:
+        logger.error(f"{name} search error: {e}")
+        return []
+
+
+async def web_search(query: str, max_results: int = 3) -> list[SearchResult]:
+    """
+    Search trusted legal sources.
+    
+    Queries the Indian Kanoon API (when a token is configured), DuckDuckGo's
+    HTML endpoint and SearXNG concurrently, then fills the results in that
+    order of preference, skipping duplicate URLs. Falls back gracefully if
+    a search fails.
+    """
+    providers = [("DuckDuckGo", _search_ddg), ("SearXNG", _search_searxng)]
+    if INDIANKANOON_API_TOKEN:
+        providers.insert(0, ("Indian Kanoon", _search_indiankanoon))
+    
+    # Total latency is the slowest provider, not the sum of all of them
+    batches = await asyncio.gather(
+        *(_run_search(name, search, query, max_results) for name, search in providers)
+    )
     
+    results: list[SearchResult] = []
+    seen_urls: set[str] = set()
+    for result in (r for batch in batches for r in batch):
+        if len(results) >= max_results:
+            break
+        if result.url not in seen_urls:
+            seen_urls.add(result.url)
+            results.append(result)
+    
+    logger.info(f"Web search found {len(results)} trusted results")
     return results
 
 
+# Max bytes of a page downloaded by read_url
+MAX_PAGE_BYTES = 256 * 1024
+
+_TEXT_CONTENT_TYPES = ("text/", "application/xhtml+xml")
+
+# Regex fallback patterns (used when selectolax is not installed)
+_TITLE_RE: Final[re.Pattern[str]] = re.compile(r'<title[^>]*>([^<]+)</title>', re.IGNORECASE)
+_TAG_RE: Final[re.Pattern[str]] = re.compile(r'<[^>]+>')
+_WS_RE: Final[re.Pattern[str]] = re.compile(r'\s+')
+
+# Where the page's main text usually lives, most specific first
+_CONTENT_SELECTORS = ("main", "article", "#content", ".content", "body")
+
+# Elements whose text is never page content
+_NON_CONTENT_TAGS = ["script", "style", "noscript", "template", "svg"]
+
+
+def _extract_page(html: str, fallback_title: str) -> tuple[str, str]:
+    """
+    Extract the title and visible body text from HTML.
+    
+    Uses selectolax's C parser when installed, else regex tag stripping.
+    
+    Returns:
+        Tuple of (title, body text truncated to 3000 chars).
+    """
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        title_node = tree.css_first("title")
+        title = title_node.text(strip=True) if title_node else ""
+        
+        tree.strip_tags(_NON_CONTENT_TAGS)
+        
+        # Prefer the main content container over navigation and footers
+        container = next(
+            (node for node in map(tree.css_first, _CONTENT_SELECTORS) if node is not None),
+            None,
+        )
+        body = container.text(separator=" ") if container is not None else ""
+        body = " ".join(body.split())[:3000]
+        return title or fallback_title, body
+    
+    title_match = _TITLE_RE.search(html)
+    title = title_match.group(1) if title_match else fallback_title
+    
+    # Strip HTML tags for body
+    body = _TAG_RE.sub(' ', html)
+    body = _WS_RE.sub(' ', body)[:3000]
+    return title, body
+
+
+# Recently read pages, keyed by URL
+PAGE_CACHE_SIZE = 256
+PAGE_CACHE_TTL = 3600.0  # seconds
+
+_page_cache: OrderedDict[str, tuple[float, PageContent]] = OrderedDict()
+
+# Reads in progress, so concurrent requests for one URL share a fetch
+_pages_in_flight: dict[str, asyncio.Future] = {}
+
+
 async def read_url(url: str) -> PageContent | None:
     """
     Read content from a trusted URL using httpx.
+    
+    Pages are cached for PAGE_CACHE_TTL seconds, and concurrent reads of
+    the same URL wait for a single fetch.
     """
-    if not is_trusted_domain(url):
+    netloc = _trusted_netloc(url)
+    if not netloc:
         logger.warning(f"Blocked untrusted URL: {url}")
         return None
     
+    cached = _page_cache.get(url)
+    if cached and cached[0] > time.monotonic():
+        _page_cache.move_to_end(url)
+        return cached[1]
+    
+    in_flight = _pages_in_flight.get(url)
+    if in_flight is not None:
+        # Shield so a cancelled waiter doesn't cancel the shared fetch
+        return await asyncio.shield(in_flight)
+    
+    future = asyncio.get_running_loop().create_future()
+    _pages_in_flight[url] = future
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            response = await client.get(url, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            })
+        page = await _read_page(url, netloc)
+    except BaseException:
+        # Don't leave concurrent waiters hanging if this read is cancelled
+        future.set_result(None)
+        raise
+    finally:
+        del _pages_in_flight[url]
+    future.set_result(page)
+    
+    if page is not None:
+        _page_cache[url] = (time.monotonic() + PAGE_CACHE_TTL, page)
+        _page_cache.move_to_end(url)
+        while len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    
+    return page
+
+
+async def _read_page(url: str, netloc: str) -> PageContent | None:
+    """Fetch and extract a trusted page."""
+    try:
+        async with _fetch(url, headers=_HTML_ACCEPT, follow_redirects=True) as response:
+            if response.status_code != 200:
+                return None
+            
+            content_type = response.headers.get("content-type", "")
+            if content_type and not content_type.startswith(_TEXT_CONTENT_TYPES):
+                logger.info(f"Skipping non-text page {url} ({content_type})")
+                return None
             
-            if response.status_code == 200:
-                # Simple content extraction
-                text = response.text
-                
-                # Try to extract title
-                import re
-                title_match = re.search(r'<title[^>]*>([^<]+)</title>', text, re.IGNORECASE)
-                title = title_match.group(1) if title_match else urlparse(url).netloc
-                
-                # Strip HTML tags for body
-                body = re.sub(r'<[^>]+>', ' ', text)
-                body = re.sub(r'\s+', ' ', body)[:3000]
-                
-                return PageContent(
-                    url=url,
-                    title=sanitize_web_content(title, 200),
-                    text=sanitize_web_content(body, 3000),
-                    domain=urlparse(url).netloc,
-                )
-                
-    except Exception as e:
+            # Only the start of the page is needed for 3000 chars of text
+            buf = bytearray()
+            async for chunk in response.aiter_bytes():
+                buf.extend(chunk)
+                if len(buf) >= MAX_PAGE_BYTES:
+                    break
+            text = buf.decode(response.encoding or "utf-8", errors="replace")
+        
+        title, body = _extract_page(text, fallback_title=netloc)
+        
+        return PageContent(
+            url=url,
+            title=sanitize_web_content(title, 200),
+            text=sanitize_web_content(body, 3000),
+            domain=netloc,
+        )
+        
+    except _WEB_ERRORS as e:
         logger.error(f"Error reading page {url}: {e}")
     
     return None
@@ -5,6 +5,7 @@ Centralizes all settings, paths, and environment variables.
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Final
 
@@ -35,6 +36,10 @@ DATA_DIR: Final[Path] = BASE_DIR / "data" / "processed"
 
 FAISS_INDEX_PATH: Final[Path] = DATA_DIR / "faiss.index"
 FAISS_META_PATH: Final[Path] = DATA_DIR / "faiss_meta.pkl"
+# Optional Arrow copy of the metadata, memory-mapped instead of unpickled
+FAISS_META_ARROW_PATH: Final[Path] = DATA_DIR / "faiss_meta.arrow"
+# Full-precision embeddings, only written for compressed indexes (exact rerank)
+FAISS_EMBEDDINGS_PATH: Final[Path] = DATA_DIR / "embeddings_fp32.npy"
 
 # =============================================================================
 # API KEYS
@@ -48,6 +53,11 @@ GROQ_API_KEY: Final[str] = os.getenv("GROQ_API_KEY", "")
 
 EMBEDDING_MODEL: Final[str] = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Run the embedder on ONNX Runtime with an INT8-quantized graph (faster on CPU).
+# Needs the "onnx" extra; the file is looked up inside the model repo.
+USE_ONNX_EMBEDDER: Final[bool] = os.getenv("USE_ONNX_EMBEDDER", "false").lower() == "true"
+ONNX_EMBEDDER_FILE: Final[str] = os.getenv("ONNX_EMBEDDER_FILE", "onnx/model_qint8_avx2.onnx")
+
 # Groq models ranked by capability:
 # - llama-3.3-70b-versatile: 128K context, best reasoning (recommended)
 # - llama-3.1-70b-versatile: 128K context, great reasoning
@@ -59,9 +69,48 @@ GROQ_MODEL: Final[str] = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 # =============================================================================
 
 TOP_K: Final[int] = 5
-# Higher threshold = more confident/relevant results only
+# Higher threshold = more confident/relevant results only.
+# Calibrated on exact (Flat) scores; PQ-compressed indexes return
+# approximate scores, so re-check it when switching index type.
 CONFIDENCE_THRESHOLD: Final[float] = 0.60
 
+# Metadata field with the precomputed section-text prefix shown to the LLM,
+# and its length; must match scripts/config.py (derived at load if missing)
+TEXT_PREVIEW_FIELD: Final[str] = "text_preview"
+TEXT_PREVIEW_CHARS: Final[int] = 800
+
+# Retrieved sections handed to the LLM: at most this many, each clipped to
+# this many characters (values above TEXT_PREVIEW_CHARS do nothing)
+MAX_CTX_CHUNKS: Final[int] = int(os.getenv("MAX_CTX_CHUNKS", "3"))
+MAX_CHUNK_CHARS: Final[int] = int(os.getenv("MAX_CHUNK_CHARS", "800"))
+
+# IVF lists probed per query (ignored by Flat indexes)
+FAISS_NPROBE: Final[int] = int(os.getenv("FAISS_NPROBE", "16"))
+
+# Candidates fetched from a compressed index and re-scored exactly
+RERANK_CANDIDATES: Final[int] = int(os.getenv("RERANK_CANDIDATES", "50"))
+
+# Semantic answer cache: reuse an agent answer when a new query is this
+# similar (cosine) to a cached one, for up to TTL seconds. Only the query is
+# compared, so keep this high enough that rewordings match but different
+# questions about the same section do not.
+ANSWER_CACHE_SIMILARITY: Final[float] = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.97"))
+ANSWER_CACHE_TTL: Final[float] = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+# =============================================================================
+# AGENT SETTINGS
+# =============================================================================
+
+# Input-token budget for each LLM call in the agent loop
+AGENT_MAX_INPUT_TOKENS: Final[int] = int(os.getenv("AGENT_MAX_INPUT_TOKENS", "6000"))
+
+# Start web_search alongside rag_search, cancelling it when the local
+# database has a confident hit. Only pays off when the model's follow-up
+# web_search reuses the rag_search query, so it is off by default.
+SPECULATIVE_WEB_SEARCH: Final[bool] = (
+    os.getenv("SPECULATIVE_WEB_SEARCH", "false").lower() == "true"
+)
+
 # =============================================================================
 # SERVER SETTINGS
 # =============================================================================
@@ -93,11 +142,17 @@ LOG_FORMAT: Final[str] = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s
 # List of valid API keys (Bearer tokens)
 # In production, these should be loaded from env vars or a secure secret manager
 _keys_str = os.getenv("API_SECRET_KEYS", "nyay-sathi-local-dev-key")
-API_SECRET_KEYS: Final[list[str]] = [k.strip() for k in _keys_str.split(",") if k.strip()]
+API_SECRET_KEYS: Final[frozenset[str]] = frozenset(
+    k.strip() for k in _keys_str.split(",") if k.strip()
+)
 
 # Rate limit (requests per minute per IP)
 RATE_LIMIT_PER_MINUTE: Final[int] = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
 
+# Shared rate-limit counters across workers/replicas (needs the "redis" extra);
+# empty = per-process counters
+REDIS_URL: Final[str] = os.getenv("REDIS_URL", "")
+
 # =============================================================================
 # WEB SEARCH FALLBACK
 # =============================================================================
@@ -106,10 +161,29 @@ WEB_SEARCH_ENABLED: Final[bool] = os.getenv("WEB_SEARCH_ENABLED", "true").lower(
 WEB_SEARCH_TIMEOUT: Final[float] = float(os.getenv("WEB_SEARCH_TIMEOUT", "10.0"))
 WEB_SEARCH_MAX_RESULTS: Final[int] = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "3"))
 
+# Indian Kanoon search API (https://api.indiankanoon.org), tried before the
+# general web search. Disabled when no token is set.
+INDIANKANOON_API_TOKEN: Final[str] = os.getenv("INDIANKANOON_API_TOKEN", "")
+
+# Max outbound web requests in flight at once (search + page reads), in total
+# and per host, and how long a request may wait for a free slot (seconds)
+WEB_FETCH_CONCURRENCY: Final[int] = int(os.getenv("WEB_FETCH_CONCURRENCY", "16"))
+WEB_FETCH_PER_HOST: Final[int] = int(os.getenv("WEB_FETCH_PER_HOST", "4"))
+WEB_FETCH_QUEUE_TIMEOUT: Final[float] = float(os.getenv("WEB_FETCH_QUEUE_TIMEOUT", "5.0"))
+
+# Connection pool for the shared web client
+WEB_MAX_CONNECTIONS: Final[int] = int(os.getenv("WEB_MAX_CONNECTIONS", "20"))
+WEB_MAX_KEEPALIVE: Final[int] = int(os.getenv("WEB_MAX_KEEPALIVE", "10"))
+WEB_KEEPALIVE_EXPIRY: Final[float] = float(os.getenv("WEB_KEEPALIVE_EXPIRY", "30.0"))
+
 # =============================================================================
 # GPU / DEVICE CONFIGURATION
 # =============================================================================
 
+# Memory-constrained hosting (e.g. Railway free tier): CPU only, minimal threads
+RAILWAY_SAFE: Final[bool] = os.getenv("RAILWAY_SAFE", "false").lower() in ("1", "true")
+
+
 # Auto-detect GPU availability
 def _detect_device() -> str:
     try:
@@ -122,6 +196,18 @@ def _detect_device() -> str:
         pass
     return "cpu"
 
-DEVICE: Final[str] = os.getenv("DEVICE", _detect_device())
+
+@lru_cache(maxsize=1)
+def get_device() -> str:
+    """
+    Get the device for the embedding model.
+
+    Forced to CPU in RAILWAY_SAFE mode. Otherwise uses the DEVICE env var
+    if set, or auto-detects on first call, which imports torch (so
+    importing config stays cheap).
+    """
+    if RAILWAY_SAFE:
+        return "cpu"
+    return os.getenv("DEVICE") or _detect_device()
 
 
@@ -0,0 +1,153 @@
+"""
+Token budgeting for the agent conversation.
+
+Keeps the messages sent to the LLM within a fixed input-token budget so
+long multi-tool sessions don't grow until the provider truncates them.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+import orjson
+
+from config import AGENT_MAX_INPUT_TOKENS
+from logger import rag_logger as logger
+
+
+# Tool results larger than this are replaced by a compact preview
+MAX_TOOL_MESSAGE_TOKENS = 800
+TOOL_PREVIEW_CHARS = 1200
+
+# Per-message framing overhead (role, separators) in chat formats
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# Fallback ratio when tiktoken is unavailable
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoder() -> Any:
+    """Load the tokenizer once (None if tiktoken is not available)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in a string."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode_ordinary(text))
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def count_tokens_batch(texts: list[str]) -> list[int]:
+    """Count tokens in several strings with one tokenizer call."""
+    encoder = _get_encoder()
+    if encoder:
+        return [len(ids) for ids in encoder.encode_ordinary_batch(texts)]
+    return [len(text) // _CHARS_PER_TOKEN + 1 if text else 0 for text in texts]
+
+
+def _message_text(message: dict) -> str:
+    """Get the text of a chat message that counts towards the budget."""
+    parts = [message.get("content") or ""]
+    for tc in message.get("tool_calls") or []:
+        function = tc.get("function", {})
+        parts.append(function.get("name", ""))
+        parts.append(function.get("arguments", ""))
+    return "\n".join(parts)
+
+
+def _message_tokens(message: dict) -> int:
+    """Count tokens in a chat message, including any tool calls."""
+    return _MESSAGE_OVERHEAD_TOKENS + count_tokens(_message_text(message))
+
+
+def _shrink_tool_message(message: dict) -> dict:
+    """Replace an oversized tool result with a valid-JSON preview."""
+    content = message.get("content") or ""
+    try:
+        status = orjson.loads(content).get("status", "unknown")
+    except (orjson.JSONDecodeError, AttributeError):
+        status = "unknown"
+
+    preview = orjson.dumps(
+        {"status": status, "data_truncated": True, "preview": content[:TOOL_PREVIEW_CHARS]}
+    ).decode("utf-8")
+    return {**message, "content": preview}
+
+
+def _group_turns(messages: list[dict]) -> list[list[int]]:
+    """
+    Group message indices into units that must be kept or dropped together.
+
+    An assistant message with tool_calls and the tool messages answering it
+    form one unit, since the API rejects orphaned tool messages.
+    """
+    groups: list[list[int]] = []
+    for i, message in enumerate(messages):
+        if message.get("role") == "tool" and groups:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    return groups
+
+
+def fit_messages(messages: list[dict], max_in_tokens: int = AGENT_MAX_INPUT_TOKENS) -> list[dict]:
+    """
+    Fit the conversation into an input-token budget.
+
+    Always keeps the system prompt, the user's question and the most recent
+    user turn. Oversized tool results are shrunk first, then the oldest
+    assistant/tool turns are dropped until the rest fits.
+
+    Args:
+        messages: Chat messages, system prompt first.
+        max_in_tokens: Input-token budget for the whole request.
+
+    Returns:
+        A new message list within budget (where possible).
+    """
+    fitted = [
+        _shrink_tool_message(m)
+        if m.get("role") == "tool" and _message_tokens(m) > MAX_TOOL_MESSAGE_TOKENS
+        else m
+        for m in messages
+    ]
+
+    tokens = [
+        _MESSAGE_OVERHEAD_TOKENS + n
+        for n in count_tokens_batch([_message_text(m) for m in fitted])
+    ]
+    if sum(tokens) <= max_in_tokens:
+        return fitted
+
+    user_indices = [i for i, m in enumerate(fitted) if m.get("role") == "user"]
+    protected = {0, *user_indices[:1], *user_indices[-1:]}
+
+    budget = max_in_tokens - sum(tokens[i] for i in protected)
+    keep = set(protected)
+
+    # Walk turns newest to oldest, keeping whole turns while they fit
+    for group in reversed(_group_turns(fitted)):
+        if protected.intersection(group):
+            continue
+        group_tokens = sum(tokens[i] for i in group)
+        if group_tokens > budget:
+            break
+        budget -= group_tokens
+        keep.update(group)
+
+    dropped = len(fitted) - len(keep)
+    if dropped:
+        logger.debug(
+            f"Context budget: dropped {dropped} old messages to fit {max_in_tokens} tokens"
+        )
+
+    return [m for i, m in enumerate(fitted) if i in keep]
@@ -0,0 +1,71 @@
+"""
+Shared Groq LLM client for Nyay Sathi.
+
+The agent and the RAG explanation path reuse one pooled client, so
+concurrent requests share keep-alive (HTTP/2 where available) connections
+instead of each paying for TCP + TLS setup.
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import Any
+
+import httpx
+
+from config import GROQ_API_KEY
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+try:
+    from groq import AsyncGroq as _GroqClient
+    ASYNC_GROQ = True
+except ImportError:
+    # Older SDKs only ship the sync client; calls then run in a worker thread
+    from groq import Groq as _GroqClient
+    ASYNC_GROQ = False
+
+
+# Connection pool shared by all in-flight LLM calls
+LLM_MAX_CONNECTIONS = 100
+LLM_MAX_KEEPALIVE = 50
+LLM_TIMEOUT = httpx.Timeout(30.0, connect=3.0)
+
+
+@lru_cache(maxsize=1)
+def get_groq_client() -> Any:
+    """Get the shared Groq client (one connection pool per process)."""
+    http_client_class = httpx.AsyncClient if ASYNC_GROQ else httpx.Client
+    http_client = http_client_class(
+        http2=_HTTP2,
+        timeout=LLM_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        ),
+    )
+    return _GroqClient(api_key=GROQ_API_KEY, http_client=http_client, max_retries=2)
+
+
+async def create_chat_completion(**kwargs: Any) -> Any:
+    """Create a (non-streaming) chat completion without blocking the event loop."""
+    client = get_groq_client()
+    if ASYNC_GROQ:
+        return await client.chat.completions.create(**kwargs)
+    return await asyncio.to_thread(client.chat.completions.create, **kwargs)
+
+
+async def close_groq_client() -> None:
+    """Close the shared client's connection pool (call on shutdown)."""
+    if not get_groq_client.cache_info().currsize:
+        return
+
+    client = get_groq_client()
+    get_groq_client.cache_clear()
+    if ASYNC_GROQ:
+        await client.close()
+    else:
+        client.close()
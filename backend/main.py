@@ -13,19 +13,22 @@ Features:
 """
 
 import asyncio
-import json
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, List, Optional
+from typing import Any, AsyncGenerator, AsyncIterator, List, Optional
 
+import orjson
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
+from agent import extract_sources, run_agent, run_agent_streaming
 from auth import verify_api_key
-from config import CORS_ORIGINS, RATE_LIMIT_PER_MINUTE
+from browser import close_client, warm_up_client
+from config import CORS_ORIGINS, RATE_LIMIT_PER_MINUTE, WEB_SEARCH_ENABLED, get_device
+from llm import close_groq_client
 from logger import app_logger as logger
-from rag_engine import initialize_rag
+from rag_engine import close_rag, get_executor, initialize_rag, warm_up_embedder
 from rate_limiter import RateLimitMiddleware
 from sanitizer import validate_query
 
@@ -85,26 +88,53 @@ class ErrorResponse(BaseModel):
 # LIFECYCLE
 # =============================================================================
 
+# Seconds shutdown waits for an unfinished embedding warm-up
+WARM_UP_SHUTDOWN_TIMEOUT = 10.0
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle manager."""
     # Startup
     logger.info("Starting Nyay Sathi Backend v2.0...")
     try:
-        from config import DEVICE
         vector_count = initialize_rag()
         app.state.vectors_loaded = vector_count
-        app.state.device = DEVICE
-        logger.info(f"RAG system ready with {vector_count} vectors on {DEVICE}")
+        app.state.device = get_device()
+        logger.info(f"RAG system ready with {vector_count} vectors on {app.state.device}")
     except Exception as e:
         logger.error(f"Failed to initialize RAG: {e}")
         app.state.vectors_loaded = 0
         app.state.device = "unavailable"
 
+    # Load the embedding model in the background so the first query is fast.
+    # It runs on the RAG pool alongside the queries that need it; shutdown
+    # waits for it before closing that pool.
+    warm_up_model = None
+    if app.state.vectors_loaded:
+        warm_up_model = asyncio.get_running_loop().run_in_executor(
+            get_executor(), warm_up_embedder
+        )
+
+    # Open the web search connection pool in the background
+    warm_up = None
+    if WEB_SEARCH_ENABLED:
+        warm_up = asyncio.create_task(warm_up_client())
+
     yield
 
     # Shutdown
     logger.info("Shutting down Nyay Sathi Backend...")
+    if warm_up is not None:
+        warm_up.cancel()
+    # A model load can't be interrupted; give it a bounded chance to finish
+    # before its thread pool is shut down
+    if warm_up_model is not None and not warm_up_model.done():
+        logger.info("Waiting for the embedding warm-up to finish...")
+        await asyncio.wait({warm_up_model}, timeout=WARM_UP_SHUTDOWN_TIMEOUT)
+    await close_client()
+    await close_groq_client()
+    await close_rag()
 
 
 # =============================================================================
@@ -116,6 +146,7 @@ app = FastAPI(
     description="Indian Legal RAG System - AI-powered legal information assistant",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     responses={
         401: {"model": ErrorResponse, "description": "Unauthorized"},
         429: {"description": "Rate limit exceeded"},
@@ -183,7 +214,7 @@ def detailed_health(request: Request) -> HealthResponse:
 async def ask_question(
     request: AskRequest,
     _token: str = Depends(verify_api_key),
-) -> AskResponse:
+) -> ORJSONResponse:
     """
     Answer a legal question using RAG.
 
@@ -204,57 +235,86 @@ async def ask_question(
     logger.info(f"Processing query: {sanitized_query[:50]}...")
 
     # Process query through agentic pipeline
-    from agent import run_agent
     result = await run_agent(sanitized_query)
 
-    # Determine confidence from mode
     mode = result.get("mode", "fallback")
-    if mode == "grounded":
-        confidence_str = "high"
-    elif mode == "hybrid":
-        confidence_str = "medium"
-    else:
-        confidence_str = "low"
 
     # Agent returns tools_used, convert to sources
-    local_sources = []
-    web_sources = []
-    
-    for tool in result.get("tools_used", []):
-        if tool["name"] == "rag_search" and tool.get("result") == "success":
-            # Extract local sources
-            data = tool.get("data", [])
-            if isinstance(data, list):
-                for item in data:
-                    local_sources.append(LocalSource(
-                        act=item.get("act", "Unknown"),
-                        section=str(item.get("section", "Unknown")),
-                        text=item.get("text", "")[:500],
-                        score=item.get("score", 0.0),
-                    ))
-        
-        elif tool["name"] == "web_search" and tool.get("result") == "success":
-            # Extract web sources
-            data = tool.get("data", [])
-            if isinstance(data, list):
-                for item in data:
-                    web_sources.append(WebSource(
-                        url=item.get("url", ""),
-                        title=item.get("title", ""),
-                        domain=item.get("domain", ""),
-                    ))
-
-    logger.info(f"Response: mode={mode}, tools={[t['name'] for t in result.get('tools_used', [])]}")
-
-    return AskResponse(
+    local, web = extract_sources(result.get("tools_used", []), text_chars=500)
+    local_sources = [LocalSource(**source) for source in local]
+    web_sources = [WebSource(**source) for source in web]
+
+    logger.info(f"Response: mode={mode}, tools={[t.name for t in result.get('tools_used', [])]}")
+
+    response = AskResponse(
         mode=mode,
-        confidence=confidence_str,
+        confidence=result.get("confidence", "low"),
         answer=result.get("answer", "No answer"),
         tokens_in=result.get("tokens_in", 0),
         tokens_out=result.get("tokens_out", 0),
         local_sources=local_sources,
         web_sources=web_sources,
     )
+    # Already validated above; returning a Response skips FastAPI re-validating
+    # it against response_model, and orjson serializes the (often long) answer
+    return ORJSONResponse(response.model_dump())
+
+
+# Pre-encoded SSE envelope for answer_delta events; only the text is
+# serialized per chunk
+_ANSWER_DELTA_PREFIX = b'event: answer_delta\ndata: {"type":"answer_delta","text":'
+_ANSWER_DELTA_SUFFIX = b'}\n\n'
+_SSE_DONE = b"event: done\ndata: {}\n\n"
+
+
+def _sse_event(event_type: str, data: Any) -> bytes:
+    """Encode one Server-Sent Event frame."""
+    return b"event: " + event_type.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+# Comment frame sent on idle streams so proxies don't time the connection out
+SSE_KEEPALIVE_INTERVAL = 15.0
+_SSE_PING = b": ping\n\n"
+
+
+async def _with_keepalive(
+    frames: AsyncIterator[bytes],
+    interval: float = SSE_KEEPALIVE_INTERVAL,
+) -> AsyncGenerator[bytes, None]:
+    """Relay SSE frames, yielding a ping whenever none arrives within interval."""
+    next_frame: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if next_frame is None:
+                next_frame = asyncio.ensure_future(anext(frames))
+            done, _ = await asyncio.wait({next_frame}, timeout=interval)
+            if not done:
+                yield _SSE_PING
+                continue
+            try:
+                frame = next_frame.result()
+            except StopAsyncIteration:
+                return
+            next_frame = None
+            yield frame
+    finally:
+        if next_frame is not None:
+            next_frame.cancel()
+
+
+class EventStreamResponse(StreamingResponse):
+    """StreamingResponse for pre-encoded Server-Sent Event frames, with keepalive pings."""
+
+    media_type = "text/event-stream"
+
+    def __init__(self, frames: AsyncIterator[bytes], **kwargs: Any) -> None:
+        headers = {
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            **(kwargs.pop("headers", None) or {}),
+        }
+        super().__init__(_with_keepalive(frames), headers=headers, **kwargs)
 
 
 @app.post("/ask/stream")
@@ -268,6 +328,8 @@ async def ask_question_stream(
     Events:
     - status: Progress updates (thinking, searching, etc.)
     - tool: Tool execution details
+    - answer_delta: Partial answer text
+    - answer_reset: Discard the partial answer text received so far
     - answer: Final answer
     - sources: Source information
     - done: Completion signal
@@ -279,31 +341,25 @@ async def ask_question_stream(
     
     logger.info(f"[Stream] Processing: {sanitized_query[:50]}...")
     
-    async def event_generator() -> AsyncGenerator[str, None]:
+    async def event_generator() -> AsyncGenerator[bytes, None]:
         """Generate SSE events."""
-        from agent import run_agent_streaming
         
         try:
             async for event in run_agent_streaming(sanitized_query):
                 event_type = event.get("type", "status")
-                data = json.dumps(event, ensure_ascii=False)
-                yield f"event: {event_type}\ndata: {data}\n\n"
+                if event_type == "answer_delta":
+                    # Hot path: one event per streamed token chunk
+                    yield _ANSWER_DELTA_PREFIX + orjson.dumps(event["text"]) + _ANSWER_DELTA_SUFFIX
+                    continue
+                yield _sse_event(event_type, event)
             
-            yield f"event: done\ndata: {{}}\n\n"
+            yield _SSE_DONE
             
         except Exception as e:
             logger.error(f"Stream error: {e}")
-            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            yield _sse_event("error", {"error": str(e)})
     
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+    return EventStreamResponse(event_generator())
 
 
 @app.get("/sources")
@@ -16,7 +16,11 @@ from __future__ import annotations
 import asyncio
 import os
 import pickle
+import threading
+import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, takewhile
 from typing import Any, Optional
 
 # Force environment before torch import
@@ -24,31 +28,70 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 import faiss
 import numpy as np
-from groq import Groq
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None  # Metadata is read from the pickle instead
 
 from config import (
+    FAISS_EMBEDDINGS_PATH,
     FAISS_INDEX_PATH,
+    FAISS_META_ARROW_PATH,
     FAISS_META_PATH,
     EMBEDDING_MODEL,
     GROQ_MODEL,
     GROQ_API_KEY,
     TOP_K,
     CONFIDENCE_THRESHOLD,
-    DEVICE,
+    FAISS_NPROBE,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL,
+    MAX_CHUNK_CHARS,
+    MAX_CTX_CHUNKS,
+    RAILWAY_SAFE,
+    RERANK_CANDIDATES,
+    TEXT_PREVIEW_CHARS,
+    TEXT_PREVIEW_FIELD,
+    ONNX_EMBEDDER_FILE,
+    USE_ONNX_EMBEDDER,
     WEB_SEARCH_ENABLED,
+    get_device,
 )
+from llm import create_chat_completion
 from logger import rag_logger as logger
 
 
+__all__ = [
+    "initialize_rag",
+    "close_rag",
+    "get_executor",
+    "get_vectors_count",
+    "warm_up_embedder",
+    "retrieve_sections",
+    "retrieve_sections_async",
+    "get_cached_answer",
+    "cache_answer",
+    "explain_with_llm",
+]
+
+
 # =============================================================================
 # GLOBAL STATE (Lazy Loading for Memory Efficiency)
 # =============================================================================
 
 _index: Optional[faiss.Index] = None
-_metadata: Optional[list[dict]] = None
+# Metadata stored column-wise (field -> object array indexed by vector id)
+_meta_columns: Optional[dict[str, np.ndarray]] = None
+# Or, when an Arrow copy exists, a memory-mapped table read row by row
+_meta_table: Any = None
+_meta_count = 0
+# Full-precision vectors (memory-mapped) for reranking compressed-index hits
+_embeddings: Optional[np.ndarray] = None
 _embedder: Any = None
-_client: Optional[Groq] = None
 _executor: Optional[ThreadPoolExecutor] = None
+_embedder_lock = threading.Lock()
 
 
 # =============================================================================
@@ -67,40 +110,117 @@ def initialize_rag() -> int:
     Raises:
         FileNotFoundError: If required files are missing.
     """
-    global _index, _metadata, _client, _executor
+    global _index, _meta_columns, _meta_table, _meta_count, _embeddings, _executor
 
-    logger.info(f"Initializing RAG system (device: {DEVICE})...")
+    logger.info("Initializing RAG system...")
     logger.debug(f"FAISS path: {FAISS_INDEX_PATH}")
 
     if not FAISS_INDEX_PATH.exists():
         raise FileNotFoundError(f"FAISS index not found: {FAISS_INDEX_PATH}")
 
-    if not FAISS_META_PATH.exists():
+    use_arrow = pa is not None and FAISS_META_ARROW_PATH.exists()
+    if not use_arrow and not FAISS_META_PATH.exists():
         raise FileNotFoundError(f"FAISS metadata not found: {FAISS_META_PATH}")
 
-    # Load FAISS index
-    _index = faiss.read_index(str(FAISS_INDEX_PATH))
+    # Load FAISS index, memory-mapped where the format allows so pages are
+    # faulted in on demand instead of read into RAM up front
+    try:
+        _index = faiss.read_index(
+            str(FAISS_INDEX_PATH), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+    except RuntimeError as e:
+        logger.debug(f"FAISS mmap unavailable for this index, reading into memory: {e}")
+        _index = faiss.read_index(str(FAISS_INDEX_PATH))
     logger.info(f"Loaded FAISS index with {_index.ntotal} vectors")
 
+    # Compressed IVF indexes scan only nprobe lists per query
+    ivf = faiss.try_extract_index_ivf(_index)
+    if ivf is not None:
+        nprobe = min(FAISS_NPROBE, ivf.nlist)
+        faiss.ParameterSpace().set_index_parameter(_index, "nprobe", nprobe)
+        logger.info(f"IVF index: nlist={ivf.nlist}, nprobe={nprobe}")
+
+    # Exact vectors for two-stage search over a compressed index
+    _embeddings = None
+    if FAISS_EMBEDDINGS_PATH.exists():
+        embeddings = np.load(FAISS_EMBEDDINGS_PATH, mmap_mode="r")
+        if embeddings.shape == (_index.ntotal, _index.d):
+            _embeddings = embeddings
+            logger.info(f"Reranking top {RERANK_CANDIDATES} candidates with exact scores")
+        else:
+            logger.warning(
+                f"Ignoring {FAISS_EMBEDDINGS_PATH.name}: "
+                f"shape {embeddings.shape} doesn't match index"
+            )
+
     # Load metadata
-    with open(FAISS_META_PATH, "rb") as f:
-        _metadata = pickle.load(f)
-    logger.debug(f"Loaded {len(_metadata)} metadata records")
-
-    # Initialize Groq client
-    if GROQ_API_KEY:
-        _client = Groq(api_key=GROQ_API_KEY)
-        logger.info("Groq client initialized")
+    if use_arrow:
+        # Zero-copy: pages are read on demand, rows become dicts only when hit
+        source = pa.memory_map(str(FAISS_META_ARROW_PATH), "r")
+        _meta_table = _with_text_preview(pa.ipc.open_file(source).read_all())
+        _meta_count = _meta_table.num_rows
     else:
+        with open(FAISS_META_PATH, "rb") as f:
+            metadata = pickle.load(f)
+        _meta_columns = _to_columns(metadata)
+        _meta_count = len(metadata)
+    logger.debug(f"Loaded {_meta_count} metadata records" + (" (Arrow)" if use_arrow else ""))
+
+    if not GROQ_API_KEY:
         logger.warning("GROQ_API_KEY not set - LLM explanations disabled")
 
-    # Initialize thread pool for parallel operations
-    _executor = ThreadPoolExecutor(max_workers=4)
-    logger.debug("Thread pool initialized")
+    # Pool for all blocking work (embedding, FAISS search, file loads), sized
+    # to the CPU; one worker when memory-constrained (batching still coalesces)
+    workers = 1 if RAILWAY_SAFE else min(os.cpu_count() or 2, 8)
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag")
+    logger.debug(f"Thread pool initialized with {workers} workers")
 
     return _index.ntotal
 
 
+def _to_columns(records: list[dict]) -> dict[str, np.ndarray]:
+    """Convert metadata records into one object array per field."""
+    fields = dict.fromkeys(key for record in records for key in record)
+    columns = {}
+    for field in fields:
+        # Filled element-wise so list-valued fields aren't broadcast as 2-D
+        column = np.empty(len(records), dtype=object)
+        for i, record in enumerate(records):
+            column[i] = record.get(field)
+        columns[field] = column
+
+    # Indexes built before the prefix was stored: derive it once at load
+    if TEXT_PREVIEW_FIELD not in columns:
+        preview = np.empty(len(records), dtype=object)
+        for i, record in enumerate(records):
+            preview[i] = (record.get("text") or "")[:TEXT_PREVIEW_CHARS]
+        columns[TEXT_PREVIEW_FIELD] = preview
+
+    return columns
+
+
+def _with_text_preview(table: Any) -> Any:
+    """Add the text-prefix column to Arrow metadata from older builds."""
+    if TEXT_PREVIEW_FIELD in table.column_names or "text" not in table.column_names:
+        return table
+    preview = pc.fill_null(pc.utf8_slice_codeunits(table["text"], 0, TEXT_PREVIEW_CHARS), "")
+    return table.append_column(TEXT_PREVIEW_FIELD, preview)
+
+
+def get_executor() -> Optional[ThreadPoolExecutor]:
+    """Return the RAG thread pool (None until initialize_rag has run)."""
+    return _executor
+
+
+async def close_rag() -> None:
+    """Shut down the RAG thread pool (call on shutdown)."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
 def get_vectors_count() -> int:
     """Return the number of vectors in the index."""
     if _index is None:
@@ -116,20 +236,128 @@ def _get_embedder():
     """
     global _embedder
 
-    if _embedder is None:
-        logger.info(f"Loading embedding model on {DEVICE}...")
-        from sentence_transformers import SentenceTransformer
-
-        _embedder = SentenceTransformer(EMBEDDING_MODEL, device=DEVICE)
-        logger.info(f"Embedding model loaded on {DEVICE}")
+    if _embedder is not None:
+        return _embedder
+
+    # The startup warm-up and the first query may race to load the model
+    with _embedder_lock:
+        if _embedder is None:
+            device = get_device()
+            logger.info(f"Loading embedding model on {device}...")
+            from sentence_transformers import SentenceTransformer
+
+            if device == "cpu":
+                _configure_torch_threads()
+
+            if USE_ONNX_EMBEDDER:
+                # Same pooling and normalization, so vectors match the index
+                _embedder = SentenceTransformer(
+                    EMBEDDING_MODEL,
+                    device=device,
+                    backend="onnx",
+                    model_kwargs={"file_name": ONNX_EMBEDDER_FILE},
+                )
+            else:
+                _embedder = SentenceTransformer(EMBEDDING_MODEL, device=device)
+            backend = " (ONNX)" if USE_ONNX_EMBEDDER else ""
+            logger.info(f"Embedding model loaded on {device}{backend}")
 
     return _embedder
 
 
+def _configure_torch_threads() -> None:
+    """Pin torch's CPU thread pools so encodes don't oversubscribe the server."""
+    import torch
+
+    torch.set_num_threads(min(4, os.cpu_count() or 1))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before torch runs its first parallel op
+        pass
+
+
+def warm_up_embedder() -> None:
+    """
+    Load the embedding model and run a throwaway encode.
+
+    Meant to run in a background thread at startup so the first user query
+    doesn't pay for model loading and kernel initialization.
+    """
+    try:
+        _get_embedder().encode(["warmup"], convert_to_numpy=True, normalize_embeddings=True)
+        logger.info("Embedding model warmed up")
+    except Exception as e:
+        logger.warning(f"Embedding warm-up failed (will load on first query): {e}")
+
+
 # =============================================================================
 # RETRIEVAL
 # =============================================================================
 
+# Distinct queries whose embeddings are kept in memory (384 floats each)
+EMBEDDING_CACHE_SIZE = 1024
+
+
+def _normalize_query(query: str) -> str:
+    """Canonical cache key for a query (the MiniLM tokenizer is uncased)."""
+    return " ".join(query.lower().split())
+
+
+# Normalized query -> (dim,) embedding, least recently used first. A plain
+# OrderedDict (not lru_cache) so batches can look up hits and encode only misses.
+_embedding_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+
+def _embed_queries(queries: list[str]) -> np.ndarray:
+    """
+    Get (n, dim) embeddings for several queries.
+
+    Cached queries (matched after normalizing case and whitespace) skip the
+    transformer; the rest are encoded together in one batch.
+    """
+    keys = [_normalize_query(q) for q in queries]
+
+    with _embedding_cache_lock:
+        cached = {}
+        for key in keys:
+            vec = _embedding_cache.get(key)
+            if vec is not None:
+                _embedding_cache.move_to_end(key)
+                cached[key] = vec
+
+    misses = list(dict.fromkeys(key for key in keys if key not in cached))
+    if misses:
+        encoded = _get_embedder().encode(
+            misses,
+            batch_size=RETRIEVAL_MAX_BATCH,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+        encoded.flags.writeable = False  # Rows are shared through the cache
+
+        with _embedding_cache_lock:
+            for key, vec in zip(misses, encoded):
+                cached[key] = vec
+                _embedding_cache[key] = vec
+                _embedding_cache.move_to_end(key)
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+
+    return np.stack([cached[key] for key in keys])
+
+
+def _embed_query(query: str) -> np.ndarray:
+    """
+    Get the (1, dim) embedding for a query.
+
+    Repeat questions that differ only in case or whitespace skip the
+    transformer forward pass.
+    """
+    return _embed_queries([query])
+
+
 def retrieve_sections(query: str, top_k: int = TOP_K) -> list[dict]:
     """
     Retrieve relevant legal sections for a query.
@@ -141,36 +369,182 @@ def retrieve_sections(query: str, top_k: int = TOP_K) -> list[dict]:
     Returns:
         List of matching sections with scores.
     """
-    if _index is None or _metadata is None:
+    if _index is None or (_meta_columns is None and _meta_table is None):
         logger.error("RAG not initialized")
         return []
 
-    embedder = _get_embedder()
-
-    # Encode query
-    query_vec = embedder.encode(
-        [query],
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-    ).astype("float32")
+    # Encode query (float32; FAISS encodes to the index's SQ/PQ codes itself)
+    query_vec = _embed_query(query)
 
     # Search
-    scores, indices = _index.search(query_vec, top_k)
+    scores, indices = _search(query_vec, top_k)
+    results = _gather_hits(scores, indices)[0]
+
+    if results:
+        logger.debug(f"Retrieved {len(results)} sections (top score: {results[0]['score']:.3f})")
+    else:
+        logger.debug("No results")
+    return results
+
+
+# Per-thread (distances, labels) output arrays for FAISS, keyed by (n, k)
+_search_buffers = threading.local()
+
+
+def _result_buffers(n: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Get this thread's reusable FAISS output arrays for n queries x k hits."""
+    by_shape = getattr(_search_buffers, "by_shape", None)
+    if by_shape is None:
+        by_shape = _search_buffers.by_shape = {}
+
+    buffers = by_shape.get((n, k))
+    if buffers is None:
+        buffers = by_shape[(n, k)] = (
+            np.empty((n, k), dtype=np.float32),
+            np.empty((n, k), dtype=np.int64),
+        )
+    return buffers
+
 
+def _index_search(query_vecs: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run a FAISS search into this thread's preallocated output arrays.
+
+    The arrays are overwritten by the thread's next search, so callers must
+    copy out what they need first (the gather and rerank steps do).
+    """
+    distances, labels = _result_buffers(len(query_vecs), k)
+    _index.search(query_vecs, k, D=distances, I=labels)
+    return distances, labels
+
+
+def _search(query_vecs: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Search the index, re-scoring compressed-index candidates exactly.
+
+    With full-precision embeddings loaded, the index only recalls
+    RERANK_CANDIDATES hits per query; their exact inner products with the
+    query decide the final top_k.
+    """
+    if _embeddings is None:
+        return _index_search(query_vecs, top_k)
+
+    _, candidates = _index_search(query_vecs, max(top_k, RERANK_CANDIDATES))
+    padding = candidates < 0
+    exact = np.einsum("nrd,nd->nr", _embeddings[np.where(padding, 0, candidates)], query_vecs)
+    exact[padding] = -np.inf
+
+    if top_k < exact.shape[1]:
+        best = np.argpartition(-exact, top_k - 1, axis=1)[:, :top_k]
+    else:
+        best = np.broadcast_to(np.arange(exact.shape[1]), exact.shape)
+    best = np.take_along_axis(best, np.argsort(-np.take_along_axis(exact, best, 1), axis=1), 1)
+    return np.take_along_axis(exact, best, 1), np.take_along_axis(candidates, best, 1)
+
+
+def _gather_hits(scores: np.ndarray, indices: np.ndarray) -> list[list[dict]]:
+    """Build result records for all rows of FAISS hits in one gather."""
+    # Drop padding (-1) and stale ids, then fetch every field for all hits at once
+    valid = (indices >= 0) & (indices < _meta_count)
+    hits = indices[valid]
+    hit_scores = scores[valid].tolist()
+
+    if _meta_table is not None:
+        rows = _meta_table.take(hits).to_pylist()
+        records = [dict(row, score=score) for row, score in zip(rows, hit_scores)]
+    else:
+        fields = list(_meta_columns)
+        values = [_meta_columns[field][hits].tolist() for field in fields]
+        records = [
+            dict(zip(fields, row), score=score)
+            for *row, score in zip(*values, hit_scores)
+        ]
+
+    # Split the flat, row-major records back into one list per query
     results = []
-    for score, idx in zip(scores[0], indices[0]):
-        if idx == -1 or idx >= len(_metadata):
+    start = 0
+    for count in valid.sum(axis=1).tolist():
+        results.append(records[start:start + count])
+        start += count
+    return results
+
+
+def _retrieve_batch(queries: list[str], top_k: int) -> list[list[dict]]:
+    """Embed and search several queries with at most one encode and one FAISS call."""
+    if _index is None or (_meta_columns is None and _meta_table is None):
+        logger.error("RAG not initialized")
+        return [[] for _ in queries]
+
+    scores, indices = _search(_embed_queries(queries), top_k)
+    return _gather_hits(scores, indices)
+
+
+# =============================================================================
+# ASYNC MICRO-BATCHING
+# =============================================================================
+
+# How long the batcher waits for more queries, and how many it takes at once
+RETRIEVAL_BATCH_WINDOW = 0.005
+RETRIEVAL_MAX_BATCH = 32
+
+# Created lazily so they belong to the running event loop
+_retrieval_queue: Optional[asyncio.Queue] = None
+_retrieval_worker: Optional[asyncio.Task] = None
+
+
+async def _retrieval_batch_loop(queue: asyncio.Queue) -> None:
+    """Drain queued queries in small batches and resolve their futures."""
+    loop = asyncio.get_running_loop()
+
+    while True:
+        batch = [await queue.get()]
+        await asyncio.sleep(RETRIEVAL_BATCH_WINDOW)
+        while len(batch) < RETRIEVAL_MAX_BATCH and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
             continue
-        record = _metadata[idx].copy()
-        record["score"] = float(score)
-        results.append(record)
 
-    logger.debug(f"Retrieved {len(results)} sections (top score: {results[0]['score']:.3f})" if results else "No results")
-    return results
+        queries = [query for query, _, _ in batch]
+        top_k = max(k for _, k, _ in batch)
+        try:
+            results = await loop.run_in_executor(_executor, _retrieve_batch, queries, top_k)
+        except Exception as e:
+            logger.error(f"Batched retrieval failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        for (_, k, future), hits in zip(batch, results):
+            if not future.done():
+                future.set_result(hits[:k])
+
+
+async def retrieve_sections_async(query: str, top_k: int = TOP_K) -> list[dict]:
+    """
+    Retrieve relevant legal sections without blocking the event loop.
+
+    Queries arriving within a few milliseconds of each other are embedded
+    and searched together on the RAG thread pool.
+
+    Args:
+        query: The user's question.
+        top_k: Number of results to retrieve.
+
+    Returns:
+        List of matching sections with scores.
+    """
+    global _retrieval_queue, _retrieval_worker
 
+    if _retrieval_worker is None or _retrieval_worker.done():
+        _retrieval_queue = asyncio.Queue()
+        _retrieval_worker = asyncio.create_task(_retrieval_batch_loop(_retrieval_queue))
 
-# Alias for agent.py
-retrieve = retrieve_sections
+    future = asyncio.get_running_loop().create_future()
+    await _retrieval_queue.put((query, top_k, future))
+    return await future
 
 
 
@@ -225,16 +599,83 @@ End with: "Disclaimer: For educational purposes only, not legal advice."
 
 
 
+# Local sections passed to the LLM must score at least this (and are capped
+# at MAX_CTX_CHUNKS)
+SOURCE_MIN_SCORE = 0.5
+
+
+# =============================================================================
+# ANSWER CACHE
+# =============================================================================
+
+# Recent agent answers kept for reuse (ring buffer, oldest overwritten first)
+ANSWER_CACHE_SIZE = 256
+
+# Query embeddings stacked row-per-slot so a lookup is one mat-vec; allocated
+# on first insert. Entries hold (created_at, answer) per slot.
+_answer_cache_vecs: Optional[np.ndarray] = None
+_answer_cache_entries: list[Optional[tuple[float, Any]]] = [None] * ANSWER_CACHE_SIZE
+_answer_cache_next = 0
+
+
+async def get_cached_answer(query: str) -> Any:
+    """
+    Find a fresh cached answer for a query with near-identical meaning.
+
+    Returns None on a miss or when the query cannot be embedded.
+    """
+    if _answer_cache_vecs is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    try:
+        query_vec = await loop.run_in_executor(_executor, _embed_query, query)
+    except Exception as e:
+        logger.warning(f"Answer cache lookup failed: {e}")
+        return None
+
+    # Vectors are normalized, so the dot product is the cosine similarity
+    similarities = _answer_cache_vecs @ query_vec[0]
+    candidates = np.flatnonzero(similarities >= ANSWER_CACHE_SIMILARITY)
+    now = time.monotonic()
+
+    for slot in candidates[np.argsort(-similarities[candidates])]:
+        entry = _answer_cache_entries[slot]
+        if entry is not None and now - entry[0] < ANSWER_CACHE_TTL:
+            return entry[1]
+    return None
+
+
+async def cache_answer(query: str, answer: Any) -> None:
+    """Store an answer under its query, overwriting the oldest slot when full."""
+    global _answer_cache_vecs, _answer_cache_next
+
+    loop = asyncio.get_running_loop()
+    try:
+        query_vec = await loop.run_in_executor(_executor, _embed_query, query)
+    except Exception as e:
+        logger.warning(f"Answer cache store failed: {e}")
+        return
+
+    if _answer_cache_vecs is None:
+        _answer_cache_vecs = np.zeros((ANSWER_CACHE_SIZE, query_vec.shape[1]), dtype=np.float32)
+
+    slot = _answer_cache_next
+    _answer_cache_vecs[slot] = query_vec[0]
+    _answer_cache_entries[slot] = (time.monotonic(), answer)
+    _answer_cache_next = (slot + 1) % ANSWER_CACHE_SIZE
+
+
 # =============================================================================
 # LLM EXPLANATION
 # =============================================================================
 
-def explain_with_llm(
+async def explain_with_llm(
     query: str,
     local_results: list[dict],
     web_results: Optional[list] = None,
     source_mode: str = "local",
-) -> tuple[str, str, float]:
+) -> tuple[str, str, float, int, int]:
     """
     Generate an LLM explanation for retrieved sections.
 
@@ -245,7 +686,7 @@ def explain_with_llm(
         source_mode: One of "local", "hybrid", "fallback".
 
     Returns:
-        Tuple of (mode, explanation, confidence_score).
+        Tuple of (mode, explanation, confidence_score, tokens_in, tokens_out).
     """
     # Determine confidence and mode
     if not local_results and not web_results:
@@ -265,15 +706,19 @@ def explain_with_llm(
     # Build context with numbered citations
     context_parts = []
 
-    # Only use top 3 sources with decent scores
-    relevant_local = [r for r in local_results if r.get("score", 0) >= 0.5][:3]
+    # Only use the top sources with decent scores; hits are sorted best-first,
+    # so stop at the first one below the cut-off
+    relevant_local = list(islice(
+        takewhile(lambda r: r.get("score", 0) >= SOURCE_MIN_SCORE, local_results),
+        MAX_CTX_CHUNKS,
+    ))
 
     if relevant_local and mode in ("grounded", "hybrid"):
         context_parts.append("SOURCES:")
         for i, r in enumerate(relevant_local, 1):
             context_parts.append(
                 f"[{i}] {r.get('act_name', 'Unknown')} - Section {r.get('section_number', 'Unknown')}\n"
-                f"    {r.get('text', '')[:800]}\n"
+                f"    {r.get(TEXT_PREVIEW_FIELD, '')[:MAX_CHUNK_CHARS]}\n"
             )
 
     if web_results and mode == "hybrid":
@@ -297,17 +742,19 @@ def explain_with_llm(
     user_content = f"USER QUESTION:\n{query}\n\nAVAILABLE INFORMATION:\n{context}"
 
     # Call LLM
-    if _client is None:
+    if not GROQ_API_KEY:
         logger.warning("Groq client not available")
         return (
             "fallback",
             "LLM service not available. Please check API key configuration.\n\n"
             "Disclaimer: This information is for educational purposes only.",
             0.0,
+            0,
+            0,
         )
 
     try:
-        response = _client.chat.completions.create(
+        response = await create_chat_completion(
             model=GROQ_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -2,52 +2,157 @@
 Rate limiting middleware for Nyay Sathi API.
 
 Prevents abuse by limiting the number of requests per IP address.
+Counters live in Redis when REDIS_URL is set (shared by all workers),
+otherwise in process memory.
 """
 
 import time
-from collections import defaultdict
-from typing import Dict, Tuple
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 from fastapi import HTTPException, Request, Response, status
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 
-from config import RATE_LIMIT_PER_MINUTE
+from config import RATE_LIMIT_PER_MINUTE, REDIS_URL
 from logger import app_logger as logger
 
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:
+    aioredis = None  # Per-process counters only
+
+
+# Length of one counting window, in seconds
+WINDOW_SECONDS = 60
+
+# Redis must answer within this many seconds, or requests fall back to the
+# in-process counters; after a failure Redis is skipped for the cool-down
+_REDIS_TIMEOUT = 0.2
+_REDIS_COOLDOWN_SECONDS = 30.0
+
+# Most IPs tracked per process; the least recently seen are evicted first
+# (an evicted IP just starts over with a fresh quota)
+MAX_TRACKED_IPS = 10_000
+
+# Atomic sliding-window check-and-increment: KEYS[1] = per-IP key prefix,
+# ARGV = now, window, limit. Returns {allowed (0/1), current window count}.
+_SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local index = math.floor(now / window)
+local cur_key = KEYS[1] .. ":" .. index
+local previous = tonumber(redis.call("GET", KEYS[1] .. ":" .. (index - 1)) or "0")
+local current = tonumber(redis.call("GET", cur_key) or "0")
+if previous * (1 - (now % window) / window) + current >= limit then
+    return {0, current}
+end
+current = redis.call("INCR", cur_key)
+redis.call("EXPIRE", cur_key, window * 2)
+return {1, current}
+"""
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
     Simple in-memory rate limiter.
     
-    Tracks request counts per IP address within a minute window.
+    Sliding-window counter per IP address: the request count of the previous
+    minute, weighted by how much of it still overlaps the last 60 seconds,
+    plus the count of the current minute. O(1) time and memory per IP.
     """
 
     def __init__(self, app, limit: int = RATE_LIMIT_PER_MINUTE):
         super().__init__(app)
         self.limit = limit
-        # Dictionary to store request timestamps: {ip: [timestamp1, timestamp2, ...]}
-        self.requests: Dict[str, list[float]] = defaultdict(list)
+        # {ip: (window_index, previous_window_count, current_window_count)},
+        # least recently seen first
+        self.buckets: OrderedDict[str, Tuple[int, int, int]] = OrderedDict()
+
+        self._redis_check = None
+        self._redis_retry_at = 0.0
+        if REDIS_URL and aioredis is not None:
+            client = aioredis.Redis.from_url(
+                REDIS_URL,
+                decode_responses=False,
+                socket_connect_timeout=_REDIS_TIMEOUT,
+                socket_timeout=_REDIS_TIMEOUT,
+            )
+            # register_script runs EVALSHA, loading the script on first use
+            self._redis_check = client.register_script(_SLIDING_WINDOW_LUA)
+        elif REDIS_URL:
+            logger.warning(
+                "REDIS_URL is set but redis is not installed; rate limits are per-process"
+            )
+
+    async def _allow_redis(self, client_ip: str) -> Optional[bool]:
+        """Check and count a request in Redis (None if Redis is unreachable)."""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            allowed, _ = await self._redis_check(
+                keys=[f"ratelimit:{client_ip}"],
+                args=[time.time(), WINDOW_SECONDS, self.limit],
+            )
+        except (RedisError, OSError) as e:
+            self._redis_retry_at = time.monotonic() + _REDIS_COOLDOWN_SECONDS
+            logger.warning(
+                f"Redis rate limiter unavailable, using in-process counters for "
+                f"{_REDIS_COOLDOWN_SECONDS:.0f}s: {e}"
+            )
+            return None
+        return bool(allowed)
+
+    def _evict(self, window: int) -> None:
+        """
+        Drop IPs idle for two windows, and the least recently seen past the cap.
+
+        Buckets are kept in last-seen order, so both kinds sit at the front
+        and eviction stops at the first one that must be kept.
+        """
+        buckets = self.buckets
+        while buckets:
+            bucket_window = next(iter(buckets.values()))[0]
+            if bucket_window >= window - 1 and len(buckets) <= MAX_TRACKED_IPS:
+                break
+            buckets.popitem(last=False)
+
+    def _allow_local(self, client_ip: str) -> bool:
+        """Check and count a request against this process's counters."""
+        now = time.monotonic()
+        window = int(now // WINDOW_SECONDS)
+
+        # Roll the counters forward to the current window
+        bucket_window, previous, current = self.buckets.get(client_ip, (window, 0, 0))
+        if bucket_window != window:
+            previous = current if bucket_window == window - 1 else 0
+            current = 0
+
+        # Check limit, recording the request if allowed
+        overlap = 1 - (now % WINDOW_SECONDS) / WINDOW_SECONDS
+        allowed = previous * overlap + current < self.limit
+        self.buckets[client_ip] = (window, previous, current + 1 if allowed else current)
+        self.buckets.move_to_end(client_ip)
+        self._evict(window)
+        return allowed
 
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         # Get client IP
         client_ip = request.client.host or "unknown"
-        
-        # Current time
-        now = time.time()
-        
-        # Clean up old requests (older than 60 seconds)
-        self.requests[client_ip] = [t for t in self.requests[client_ip] if now - t < 60]
-        
-        # Check limit
-        if len(self.requests[client_ip]) >= self.limit:
+
+        allowed = None
+        if self._redis_check is not None:
+            allowed = await self._allow_redis(client_ip)
+        if allowed is None:
+            allowed = self._allow_local(client_ip)
+
+        if not allowed:
             logger.warning(f"Rate limit exceeded for IP: {client_ip}")
             return Response(
                 content="Rate limit exceeded. Please try again later.",
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS
             )
-            
-        # Record this request
-        self.requests[client_ip].append(now)
         
         # Proceed
         return await call_next(request)
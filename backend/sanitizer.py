@@ -10,6 +10,11 @@ from typing import Optional
 
 from logger import app_logger as logger
 
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None  # Fall back to regex tag stripping
+
 
 # Patterns that may indicate prompt injection attempts
 INJECTION_PATTERNS = [
@@ -26,8 +31,36 @@ INJECTION_PATTERNS = [
     r"data:\s*text/html",
 ]
 
-# Compile patterns for efficiency
-COMPILED_PATTERNS = [re.compile(p, re.IGNORECASE) for p in INJECTION_PATTERNS]
+# All patterns as one alternation, so the input is scanned once rather
+# than once per pattern (and IGNORECASE avoids lowercasing a copy)
+_INJECTION_RE = re.compile("|".join(f"(?:{p})" for p in INJECTION_PATTERNS), re.IGNORECASE)
+
+# Every pattern above contains one of these (on lowercased, single-spaced
+# text); inputs with none of them skip the regex entirely
+_INJECTION_TRIGGERS = (
+    "ignore", "disregard", "forget", "you are now", "act as", "pretend",
+    "instruction", "prompt", "script", "javascript:", "text/html",
+)
+
+# Web content cleanup patterns (regex fallback when selectolax is missing)
+_SCRIPT_RE = re.compile(r"<script[^>]*>.*?</script>", re.DOTALL | re.IGNORECASE)
+_STYLE_RE = re.compile(r"<style[^>]*>.*?</style>", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Null bytes and control characters other than tab, newline and carriage
+# return, deleted in one C-level pass with str.translate
+_CTRL_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20)])
+
+# Input scanned per output character; markup and whitespace shrink the
+# text, but never by more than this in practice
+_WEB_INPUT_FACTOR = 3
+
+# Queries longer than this multiple of the allowed length are rejected
+# outright rather than truncated
+_OVERSIZE_FACTOR = 4
+
+# Characters html.escape rewrites (quote=True covers both quote styles)
+_HTML_ESCAPED_CHARS = ("&", "<", ">", '"', "'")
 
 
 def sanitize_user_input(text: str, max_length: int = 2000) -> str:
@@ -47,8 +80,17 @@ def sanitize_user_input(text: str, max_length: int = 2000) -> str:
     # Truncate to max length
     text = text[:max_length]
 
-    # Remove null bytes
-    text = text.replace("\x00", "")
+    # Fast path for the common clean query: printable (no control chars or
+    # whitespace other than plain spaces), single-spaced, nothing to escape
+    if (
+        text.isprintable()
+        and "  " not in text
+        and not any(c in text for c in _HTML_ESCAPED_CHARS)
+    ):
+        return text.strip()
+
+    # Remove null bytes and control characters
+    text = text.translate(_CTRL_TABLE)
 
     # Normalize whitespace
     text = " ".join(text.split())
@@ -69,12 +111,13 @@ def detect_prompt_injection(text: str) -> bool:
     Returns:
         True if injection attempt detected.
     """
-    text_lower = text.lower()
+    normalized = " ".join(text.lower().split())
+    if not any(trigger in normalized for trigger in _INJECTION_TRIGGERS):
+        return False
 
-    for pattern in COMPILED_PATTERNS:
-        if pattern.search(text_lower):
-            logger.warning(f"Potential prompt injection detected: {text[:50]}...")
-            return True
+    if _INJECTION_RE.search(text):
+        logger.warning(f"Potential prompt injection detected: {text[:50]}...")
+        return True
 
     return False
 
@@ -95,20 +138,27 @@ def sanitize_web_content(html_content: str, max_length: int = 10000) -> str:
     if not html_content:
         return ""
 
-    # Remove script tags and content
-    text = re.sub(r"<script[^>]*>.*?</script>", "", html_content, flags=re.DOTALL | re.IGNORECASE)
-
-    # Remove style tags and content
-    text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-
-    # Remove all HTML tags
-    text = re.sub(r"<[^>]+>", " ", text)
-
-    # Decode HTML entities
-    text = html.unescape(text)
+    # Never process more input than can contribute to the output
+    text = html_content[:max_length * _WEB_INPUT_FACTOR]
+
+    if HTMLParser is not None:
+        # One linear C parse: drops script/style content, decodes entities
+        tree = HTMLParser(text)
+        for node in tree.css("script, style"):
+            node.decompose()
+        root = tree.body or tree.root
+        text = root.text(separator=" ") if root is not None else ""
+    else:
+        # Remove script and style tags with their content, then all tags
+        text = _SCRIPT_RE.sub("", text)
+        text = _STYLE_RE.sub("", text)
+        text = _TAG_RE.sub(" ", text)
+
+        # Decode HTML entities
+        text = html.unescape(text)
 
     # Remove null bytes and control characters
-    text = re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", "", text)
+    text = text.translate(_CTRL_TABLE)
 
     # Normalize whitespace
     text = " ".join(text.split())
@@ -117,20 +167,28 @@ def sanitize_web_content(html_content: str, max_length: int = 10000) -> str:
     return text[:max_length].strip()
 
 
-def validate_query(query: str) -> tuple[bool, str, Optional[str]]:
+def validate_query(query: str, max_length: int = 2000) -> tuple[bool, str, Optional[str]]:
     """
     Validate a user query for safety and suitability.
 
     Args:
         query: The user's question.
+        max_length: Maximum allowed length (longer queries are truncated).
 
     Returns:
         Tuple of (is_valid, sanitized_query, error_message).
     """
-    if not query or not query.strip():
+    # Reject absurd inputs before any per-character work
+    if len(query) > _OVERSIZE_FACTOR * max_length:
+        return False, "", "Query too long"
+
+    stripped = query.strip()
+    if not stripped:
         return False, "", "Query cannot be empty"
+    if len(stripped) < 3:
+        return False, "", "Query too short (minimum 3 characters)"
 
-    sanitized = sanitize_user_input(query)
+    sanitized = sanitize_user_input(query, max_length)
 
     if len(sanitized) < 3:
         return False, sanitized, "Query too short (minimum 3 characters)"
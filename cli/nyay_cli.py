@@ -18,12 +18,12 @@ Usage:
 from __future__ import annotations
 
 import argparse
-import json
 import sys
 from pathlib import Path
 from typing import Optional
 
 import httpx
+import orjson
 from rich.prompt import Prompt
 
 from config import (
@@ -50,6 +50,12 @@ from ui import (
     StatusDisplay,
 )
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 
 # =============================================================================
 # API CLIENT
@@ -65,13 +71,24 @@ class NyaySathiClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
+        # One connection pool for the whole session, so each question
+        # reuses the keep-alive connection instead of a new TLS handshake
+        self._http = httpx.Client(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=_HTTP2,
+            timeout=REQUEST_TIMEOUT,
+        )
+
+    def close(self):
+        """Close the underlying HTTP connection pool."""
+        self._http.close()
 
     def health_check(self) -> bool:
         """Check if the API is available."""
         try:
-            with httpx.Client(timeout=5.0) as client:
-                response = client.get(f"{self.base_url}/health")
-                return response.status_code == 200
+            response = self._http.get("/health", timeout=5.0)
+            return response.status_code == 200
         except Exception:
             return False
 
@@ -88,21 +105,16 @@ class NyaySathiClient:
         Raises:
             Exception: On API errors.
         """
-        with httpx.Client(timeout=REQUEST_TIMEOUT) as client:
-            response = client.post(
-                f"{self.base_url}/ask",
-                headers=self.headers,
-                json={"question": question},
-            )
+        response = self._http.post("/ask", json={"question": question})
 
-            if response.status_code == 401:
-                raise Exception("Authentication failed. Check your API key.")
-            elif response.status_code == 429:
-                raise Exception("Rate limit exceeded. Please wait a moment.")
-            elif response.status_code != 200:
-                raise Exception(f"API error: {response.status_code}")
+        if response.status_code == 401:
+            raise Exception("Authentication failed. Check your API key.")
+        elif response.status_code == 429:
+            raise Exception("Rate limit exceeded. Please wait a moment.")
+        elif response.status_code != 200:
+            raise Exception(f"API error: {response.status_code}")
 
-            return response.json()
+        return response.json()
 
     def ask_streaming(self, question: str, display: StreamingDisplay):
         """
@@ -112,29 +124,26 @@ class NyaySathiClient:
             question: The legal question to ask.
             display: StreamingDisplay instance for live updates.
         """
-        with httpx.Client(timeout=REQUEST_TIMEOUT) as client:
-            with client.stream(
-                "POST",
-                f"{self.base_url}/ask/stream",
-                headers=self.headers,
-                json={"question": question},
-            ) as response:
-                if response.status_code == 401:
-                    raise Exception("Authentication failed. Check your API key.")
-                elif response.status_code == 429:
-                    raise Exception("Rate limit exceeded. Please wait a moment.")
-                elif response.status_code != 200:
-                    raise Exception(f"API error: {response.status_code}")
-                
-                # Process Server-Sent Events
-                buffer = ""
-                for chunk in response.iter_text():
-                    buffer += chunk
-                    
-                    # Parse SSE events
-                    while "\n\n" in buffer:
-                        event_str, buffer = buffer.split("\n\n", 1)
-                        self._process_sse_event(event_str, display)
+        with self._http.stream("POST", "/ask/stream", json={"question": question}) as response:
+            if response.status_code == 401:
+                raise Exception("Authentication failed. Check your API key.")
+            elif response.status_code == 429:
+                raise Exception("Rate limit exceeded. Please wait a moment.")
+            elif response.status_code != 200:
+                raise Exception(f"API error: {response.status_code}")
+            
+            # Process Server-Sent Events: lines accumulate until the
+            # blank line that ends each event
+            event_lines: list[str] = []
+            for line in response.iter_lines():
+                if line:
+                    event_lines.append(line)
+                elif event_lines:
+                    self._process_sse_event("\n".join(event_lines), display)
+                    event_lines.clear()
+            
+            if event_lines:
+                self._process_sse_event("\n".join(event_lines), display)
     
     def _process_sse_event(self, event_str: str, display: StreamingDisplay):
         """Parse and process a single SSE event."""
@@ -146,8 +155,8 @@ class NyaySathiClient:
                 event_type = line[7:]
             elif line.startswith("data: "):
                 try:
-                    data = json.loads(line[6:])
-                except:
+                    data = orjson.loads(line[6:])
+                except orjson.JSONDecodeError:
                     data = {"raw": line[6:]}
         
         if data is None:
@@ -211,7 +220,7 @@ def load_history() -> list[str]:
     """Load query history from file."""
     if HISTORY_FILE.exists():
         try:
-            return json.loads(HISTORY_FILE.read_text())[-MAX_HISTORY:]
+            return orjson.loads(HISTORY_FILE.read_bytes())[-MAX_HISTORY:]
         except Exception:
             return []
     return []
@@ -220,7 +229,7 @@ def load_history() -> list[str]:
 def save_history(history: list[str]):
     """Save query history to file."""
     try:
-        HISTORY_FILE.write_text(json.dumps(history[-MAX_HISTORY:]))
+        HISTORY_FILE.write_bytes(orjson.dumps(history[-MAX_HISTORY:]))
     except Exception:
         pass
 
@@ -396,10 +405,13 @@ def main():
     # Create client
     client = NyaySathiClient(args.api_url, args.api_key)
 
-    if args.question:
-        run_single_query(client, args.question)
-    else:
-        run_interactive(client)
+    try:
+        if args.question:
+            run_single_query(client, args.question)
+        else:
+            run_interactive(client)
+    finally:
+        client.close()
 
 
 if __name__ == "__main__":
@@ -9,11 +9,13 @@ import os
 import re
 import sys
 import time
-from typing import Optional, List, Dict, Any
+from collections import deque
+from typing import Optional, List, Dict, Any, Deque
 from dataclasses import dataclass, field
 
 from rich.console import Console, Group
 from rich.live import Live
+from rich.markup import escape
 from rich.panel import Panel
 from rich.spinner import Spinner
 from rich.text import Text
@@ -52,7 +54,7 @@ def print_help():
 # STREAMING STATUS DISPLAY (Claude Code-like)
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ToolStep:
     """Represents a tool execution step."""
     tool: str
@@ -64,9 +66,11 @@ class ToolStep:
     status: str = "running"  # running, success, error
     count: int = 0
     collapsed: bool = False
+    # Rendered panel of a finished step, reused until status or collapsed changes
+    _panel: Optional[Panel] = field(default=None, init=False, repr=False, compare=False)
 
 
-@dataclass  
+@dataclass(slots=True)
 class StreamingState:
     """State for streaming display."""
     current_status: str = "Starting..."
@@ -83,6 +87,11 @@ class StreamingState:
     tokens_out: int = 0
     error: str = ""
     done: bool = False
+    # Running steps per tool name in start order (tools may run in parallel,
+    # and their results arrive in the order they were started)
+    _running_steps: Dict[str, Deque[ToolStep]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
 
 class StreamingDisplay:
@@ -96,34 +105,40 @@ class StreamingDisplay:
         self.state = StreamingState()
         self.live: Optional[Live] = None
         self.start_time = time.time()
+        # Reused across frames so it keeps animating (a new one restarts)
+        self._spinner = Spinner("dots", text="")
     
     def _build_step_panel(self, step: ToolStep, index: int) -> Panel:
-        """Build a panel for a single tool step."""
-        if step.status == "running":
-            # Running state - show spinner
-            content = Text()
-            content.append(f"{step.icon} ", style="bold")
-            content.append(step.message, style="cyan")
-            if step.query:
-                content.append(f"\n   ", style="dim")
-                content.append(f'"{step.query[:60]}{"..." if len(step.query) > 60 else ""}"', style="dim italic")
-            if step.detail:
-                content.append(f"\n   {step.detail}", style="dim")
-            
-            return Panel(
-                Group(Spinner("dots", text=""), content),
-                border_style="cyan",
-                box=ROUNDED,
-                padding=(0, 1),
-            )
+        """Build a panel for a single tool step (cached once it has finished)."""
+        if step.status != "running":
+            if step._panel is None:
+                step._panel = self._build_finished_panel(step)
+            return step._panel
+        
+        # Running state - show spinner
+        markup = f"[bold]{escape(step.icon)} [/bold][cyan]{escape(step.message)}[/cyan]"
+        if step.query:
+            ellipsis = "..." if len(step.query) > 60 else ""
+            markup += f'\n   [dim italic]"{escape(step.query[:60])}{ellipsis}"[/dim italic]'
+        if step.detail:
+            markup += f"[dim]\n   {escape(step.detail)}[/dim]"
+        content = Text.from_markup(markup)
         
-        elif step.status == "success":
+        return Panel(
+            Group(self._spinner, content),
+            border_style="cyan",
+            box=ROUNDED,
+            padding=(0, 1),
+        )
+    
+    def _build_finished_panel(self, step: ToolStep) -> Panel:
+        """Build the panel for a step that has finished."""
+        if step.status == "success":
             # Success state - collapsible
-            header = Text()
-            header.append(f"✓ ", style="green bold")
-            header.append(f"{step.display_name}", style="green")
-            header.append(f" • ", style="dim")
-            header.append(f"{step.count} result{'s' if step.count != 1 else ''}", style="dim")
+            header = Text.from_markup(
+                f"[green bold]✓ [/green bold][green]{escape(step.display_name)}[/green]"
+                f"[dim] • {step.count} result{'s' if step.count != 1 else ''}[/dim]"
+            )
             
             if step.collapsed:
                 # Collapsed view - just the header
@@ -135,11 +150,11 @@ class StreamingDisplay:
                 )
             else:
                 # Expanded view
-                content = Text()
-                content.append(header)
+                content = header
                 if step.query:
-                    content.append(f"\n  Query: ", style="dim")
-                    content.append(f'"{step.query[:80]}"', style="dim italic")
+                    content = header + Text.from_markup(
+                        f'[dim]\n  Query: [/dim][dim italic]"{escape(step.query)}"[/dim italic]'
+                    )
                 
                 return Panel(
                     content,
@@ -150,10 +165,10 @@ class StreamingDisplay:
         
         else:
             # Error state
-            header = Text()
-            header.append(f"✗ ", style="red bold")
-            header.append(f"{step.display_name}", style="red")
-            header.append(f" • No results", style="dim")
+            header = Text.from_markup(
+                f"[red bold]✗ [/red bold][red]{escape(step.display_name)}[/red]"
+                "[dim] • No results[/dim]"
+            )
             
             return Panel(
                 header,
@@ -177,8 +192,9 @@ class StreamingDisplay:
         # Tool steps (show all, collapse completed ones)
         for i, step in enumerate(self.state.steps):
             # Auto-collapse completed steps except the most recent
-            if step.status != "running" and i < len(self.state.steps) - 1:
+            if step.status != "running" and i < len(self.state.steps) - 1 and not step.collapsed:
                 step.collapsed = True
+                step._panel = None
             elements.append(self._build_step_panel(step, i))
         
         # Thinking indicator
@@ -197,12 +213,18 @@ class StreamingDisplay:
         return Group(*elements)
     
     def start(self):
-        """Start the live display."""
+        """
+        Start the live display.
+        
+        Live rebuilds the display from the current state on each refresh
+        (10 per second), so updates below only change state; bursts of
+        events cost one rebuild per frame instead of one each.
+        """
         self.live = Live(
-            self._build_display(),
             console=console,
             refresh_per_second=10,
             transient=True,  # Will be replaced by final output
+            get_renderable=self._build_display,
         )
         self.live.__enter__()
     
@@ -210,8 +232,6 @@ class StreamingDisplay:
         """Update the current status message."""
         self.state.current_status = message
         self.state.current_icon = icon
-        if self.live:
-            self.live.update(self._build_display())
     
     def add_tool_start(self, tool: str, display_name: str, icon: str, message: str, 
                        query: str = "", detail: str = ""):
@@ -221,37 +241,33 @@ class StreamingDisplay:
             display_name=display_name,
             icon=icon,
             message=message,
-            query=query,
+            query=query[:80],  # Longest prefix any panel shows
             detail=detail,
             status="running"
         )
         self.state.steps.append(step)
+        self.state._running_steps.setdefault(tool, deque()).append(step)
         self.state.is_thinking = False
-        if self.live:
-            self.live.update(self._build_display())
     
     def update_tool_result(self, tool: str, status: str, count: int = 0):
         """Update a tool step with its result."""
-        for step in reversed(self.state.steps):
-            if step.tool == tool and step.status == "running":
-                step.status = status
-                step.count = count
-                break
-        if self.live:
-            self.live.update(self._build_display())
+        running = self.state._running_steps.get(tool)
+        if running:
+            step = running.popleft()
+            # Live renders (and caches finished panels) on its own thread, so
+            # fill in everything before flipping status away from "running"
+            step.count = count
+            step._panel = None
+            step.status = status
     
     def set_thinking(self, message: str):
         """Show thinking indicator."""
         self.state.is_thinking = True
         self.state.thinking_message = message
-        if self.live:
-            self.live.update(self._build_display())
     
     def set_error(self, error: str):
         """Set error state."""
         self.state.error = error
-        if self.live:
-            self.live.update(self._build_display())
     
     def set_sources(self, local: List[Dict], web: List[Dict]):
         """Set source information."""
@@ -310,26 +326,39 @@ class StatusDisplay:
 # OUTPUT FORMATTING
 # =============================================================================
 
+# Citation numbers like [1], [2] anywhere in the text
+_CITATION_SUB = re.compile(r"\[(\d+)\]")
+
+# Citation token at the start of a word, e.g. "[2]" or "[2],"
+_CITATION_MATCH = re.compile(r"\[\d+\]")
+
+# Typing effect: words are revealed in batches, one batch per frame
+_STREAM_FRAME_SECONDS = 0.05
+
+
 def colorize_citations(text: str) -> str:
     """Color citation numbers like [1], [2] in the text."""
-    return re.sub(r'\[(\d+)\]', r'[cyan][\1][/cyan]', text)
+    return _CITATION_SUB.sub(r'[cyan][\1][/cyan]', text)
 
 
 def stream_text(text: str, delay: float = 0.003):
-    """Stream text with a typing effect."""
+    """Stream text with a typing effect (about delay seconds per word)."""
+    words = text.split(" ")
+    batch_size = max(1, int(_STREAM_FRAME_SECONDS / delay)) if delay > 0 else len(words)
+    
     with Live(console=console, refresh_per_second=30, transient=False) as live:
         display_text = Text()
-        words = text.split(" ")
         
-        for i, word in enumerate(words):
-            # Check for citations to color
-            if re.match(r'\[\d+\]', word):
-                display_text.append(word + " ", style="cyan")
-            else:
-                display_text.append(word + " ")
+        for start in range(0, len(words), batch_size):
+            for word in words[start:start + batch_size]:
+                # Check for citations to color
+                if _CITATION_MATCH.match(word):
+                    display_text.append(word + " ", style="cyan")
+                else:
+                    display_text.append(word + " ")
             
             live.update(display_text)
-            time.sleep(delay)
+            time.sleep(batch_size * delay)
     
     console.print()
 
@@ -355,8 +384,7 @@ def print_answer(
         console.print()
     
     # Sources section - only show sources that are actually cited in the answer
-    import re
-    cited_numbers = set(int(m) for m in re.findall(r'\[(\d+)\]', answer))
+    cited_numbers = set(int(m) for m in _CITATION_SUB.findall(answer))
     
     # Filter to only sources that were cited
     relevant = []
@@ -6,6 +6,7 @@ index for fast similarity search.
 """
 
 import json
+import math
 import pickle
 import sys
 from pathlib import Path
@@ -14,11 +15,23 @@ import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None  # Only the pickle metadata is written
+
 from config import (
     CHUNKS_FILE,
+    FAISS_EMBEDDINGS_FILE,
     FAISS_INDEX_FILE,
+    FAISS_META_ARROW_FILE,
     FAISS_META_FILE,
     EMBEDDING_MODEL,
+    FAISS_FLAT_MAX_VECTORS,
+    FAISS_INDEX_FACTORY,
+    FAISS_PQ_M,
+    TEXT_PREVIEW_CHARS,
+    TEXT_PREVIEW_FIELD,
     ensure_directories,
 )
 from utils import setup_logger
@@ -73,6 +86,32 @@ def generate_embeddings(
     return embeddings
 
 
+def choose_index_factory(num_vectors: int) -> str:
+    """
+    Pick a FAISS index_factory string for the corpus size.
+
+    Small corpora use exact search; an IVF scan wouldn't be faster and PQ
+    training needs far more vectors than they have. Larger corpora use
+    IVF with 4-bit FastScan PQ codes, whose lookup tables fit in SIMD
+    registers. nlist is scaled to ~4*sqrt(N) and capped so every list
+    gets enough training points.
+
+    Args:
+        num_vectors: Number of vectors to index.
+
+    Returns:
+        Factory string for faiss.index_factory.
+    """
+    if FAISS_INDEX_FACTORY != "auto":
+        return FAISS_INDEX_FACTORY
+
+    if num_vectors <= FAISS_FLAT_MAX_VECTORS:
+        return "Flat"
+
+    nlist = min(2 ** round(math.log2(4 * math.sqrt(num_vectors))), num_vectors // 39)
+    return f"IVF{nlist},PQ{FAISS_PQ_M}x4fs"
+
+
 def build_index(embeddings: np.ndarray) -> faiss.Index:
     """
     Build FAISS index from embeddings.
@@ -83,32 +122,75 @@ def build_index(embeddings: np.ndarray) -> faiss.Index:
     Returns:
         FAISS index.
     """
-    dimension = embeddings.shape[1]
+    num_vectors, dimension = embeddings.shape
+    factory = choose_index_factory(num_vectors)
+    logger.info(f"Building '{factory}' index for {num_vectors} vectors")
     
-    # IndexFlatIP with normalized embeddings = Cosine Similarity
-    index = faiss.IndexFlatIP(dimension)
+    # Inner product with normalized embeddings = Cosine Similarity
+    index = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(embeddings)
     index.add(embeddings)
     
     logger.info(f"Index built with {index.ntotal} vectors")
     return index
 
 
-def save_outputs(index: faiss.Index, chunks: list[dict]) -> None:
+def save_outputs(index: faiss.Index, chunks: list[dict], embeddings: np.ndarray) -> None:
     """
     Save FAISS index and metadata.
 
     Args:
         index: FAISS index to save.
         chunks: Chunk metadata to save.
+        embeddings: Full-precision embeddings, kept for reranking when the
+            index is compressed.
     """
     FAISS_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
     
     logger.info(f"Saving index to {FAISS_INDEX_FILE}")
     faiss.write_index(index, str(FAISS_INDEX_FILE))
+
+    # Compressed indexes give approximate scores; the backend re-scores their
+    # candidates exactly against these. Flat indexes are already exact.
+    FAISS_EMBEDDINGS_FILE.unlink(missing_ok=True)
+    if not isinstance(index, faiss.IndexFlat):
+        logger.info(f"Saving rerank embeddings to {FAISS_EMBEDDINGS_FILE}")
+        np.save(FAISS_EMBEDDINGS_FILE, embeddings.astype(np.float32, copy=False))
     
+    # Precompute the text prefix the backend sends to the LLM
+    records = [
+        {**chunk, TEXT_PREVIEW_FIELD: chunk.get("text", "")[:TEXT_PREVIEW_CHARS]}
+        for chunk in chunks
+    ]
+
     logger.info(f"Saving metadata to {FAISS_META_FILE}")
     with open(FAISS_META_FILE, "wb") as f:
-        pickle.dump(chunks, f)
+        pickle.dump(records, f)
+
+    # Never leave an Arrow copy from an older build next to the new pickle
+    FAISS_META_ARROW_FILE.unlink(missing_ok=True)
+    if pa is not None:
+        save_arrow_metadata(records)
+
+
+def save_arrow_metadata(records: list[dict]) -> None:
+    """
+    Save metadata as an Arrow IPC file the backend can memory-map.
+
+    Args:
+        records: Metadata records, in index order.
+    """
+    try:
+        table = pa.Table.from_pylist(records)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        logger.warning(f"Skipping Arrow metadata, records don't fit one schema: {e}")
+        return
+
+    logger.info(f"Saving Arrow metadata to {FAISS_META_ARROW_FILE}")
+    with pa.OSFile(str(FAISS_META_ARROW_FILE), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
 
 
 def main() -> None:
@@ -131,7 +213,7 @@ def main() -> None:
     index = build_index(embeddings)
     
     # Save outputs
-    save_outputs(index, chunks)
+    save_outputs(index, chunks, embeddings)
     
     logger.info("FAISS index build complete!")
     logger.info(f"  Index: {FAISS_INDEX_FILE}")
@@ -34,6 +34,8 @@ CLEAN_FILE: Final[Path] = PROCESSED_DIR / "sections_clean.json"
 CHUNKS_FILE: Final[Path] = PROCESSED_DIR / "sections_chunks.json"
 FAISS_INDEX_FILE: Final[Path] = PROCESSED_DIR / "faiss.index"
 FAISS_META_FILE: Final[Path] = PROCESSED_DIR / "faiss_meta.pkl"
+FAISS_META_ARROW_FILE: Final[Path] = PROCESSED_DIR / "faiss_meta.arrow"
+FAISS_EMBEDDINGS_FILE: Final[Path] = PROCESSED_DIR / "embeddings_fp32.npy"
 METADATA_FILE: Final[Path] = METADATA_DIR / "acts_metadata.json"
 
 # =============================================================================
@@ -71,6 +73,20 @@ CHARS_PER_TOKEN: Final[float] = 4.0  # Approximate character to token ratio
 EMBEDDING_MODEL: Final[str] = "sentence-transformers/all-MiniLM-L6-v2"
 FAISS_TOP_K: Final[int] = 5
 
+# Section text prefix stored alongside the full text (what the LLM is shown);
+# the field name is fixed so the backend never has to guess it
+TEXT_PREVIEW_FIELD: Final[str] = "text_preview"
+TEXT_PREVIEW_CHARS: Final[int] = 800
+
+# FAISS index_factory string, or "auto": exact Flat search for small corpora,
+# 4-bit IVF-PQ FastScan (SIMD lookup tables) above FAISS_FLAT_MAX_VECTORS.
+# Scalar quantizers trade less recall for less compression: "IVF512,SQfp16"
+# halves memory vs float32, "IVF512,SQ8" quarters it (per-dim ranges are
+# trained at build time and stored in the index).
+FAISS_INDEX_FACTORY: Final[str] = os.getenv("FAISS_INDEX_FACTORY", "auto")
+FAISS_FLAT_MAX_VECTORS: Final[int] = 20_000
+FAISS_PQ_M: Final[int] = 32  # PQ sub-quantizers (384 dims / 32 = 12 per sub-vector)
+
 # =============================================================================
 # LLM SETTINGS (for query_and_explain.py)
 # =============================================================================
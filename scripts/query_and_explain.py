@@ -22,6 +22,7 @@ from config import (
     FAISS_TOP_K,
     GROQ_MODEL,
     GROQ_API_KEY,
+    TEXT_PREVIEW_CHARS,
 )
 from utils import setup_logger
 
@@ -64,6 +65,15 @@ def retrieve_sections(
     return results
 
 
+def _format_section(r: dict) -> str:
+    """Format one retrieved section for the LLM prompt."""
+    return (
+        f"Act: {r.get('act_name', 'Unknown')}\n"
+        f"Section: {r.get('section_number', 'Unknown')}\n"
+        f"Text: {r.get('text', '')[:TEXT_PREVIEW_CHARS]}\n\n"
+    )
+
+
 def explain_with_llm(
     query: str,
     retrieved: list[dict],
@@ -87,14 +97,8 @@ def explain_with_llm(
             "Disclaimer: This is for educational purposes only and is not legal advice."
         )
     
-    # Build context from retrieved sections
-    context = ""
-    for r in retrieved:
-        context += (
-            f"Act: {r.get('act_name', 'Unknown')}\n"
-            f"Section: {r.get('section_number', 'Unknown')}\n"
-            f"Text: {r.get('text', '')}\n\n"
-        )
+    # Build context from retrieved sections (clipped like the backend's prompt)
+    context = "".join(_format_section(r) for r in retrieved)
     
     prompt = f"""You are a legal information assistant for Indian laws.
 